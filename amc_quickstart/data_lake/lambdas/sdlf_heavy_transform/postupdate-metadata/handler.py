@@ -40,14 +40,12 @@ def lambda_handler(event, context):
 
         tables_to_process = event['body']['job']['jobDetails']['tables']
 
-        table_processed_paths=[]
+        # one paginated listing per processed table path gives the keys with their size and last modified date
+        s3_interface = S3Interface()
+        processed_objects = []
         for table in tables_to_process:
             path = "{}/{}".format(processed_keys_path, table)
-            processed=S3Interface().list_objects(bucket, path)
-            for p in processed:
-                table_processed_paths.append(p)
-
-        processed_keys = table_processed_paths
+            processed_objects.extend(s3_interface.list_objects_metadata(bucket, path))
         team = event['body']['team']
         pipeline = event['body']['pipeline']
         stage = event['body']['pipeline_stage']
@@ -70,12 +68,13 @@ def lambda_handler(event, context):
         dynamo_interface = DynamoInterface(dynamo_config)
 
         logger.info('Storing metadata to DynamoDB')
-        for key in processed_keys:
-            object_metadata = {
+        catalog_items = []
+        for processed_object in processed_objects:
+            catalog_items.append({
                 'bucket': bucket,
-                'key': key,
-                'size': S3Interface().get_size(bucket, key),
-                'last_modified_date': S3Interface().get_last_modified(bucket, key),
+                'key': processed_object['key'],
+                'size': processed_object['size'],
+                'last_modified_date': processed_object['last_modified_date'],
                 'org': event['body']['org'],
                 'app': event['body']['app'],
                 'env': event['body']['env'],
@@ -85,14 +84,14 @@ def lambda_handler(event, context):
                 'stage': 'stage',
                 'pipeline_stage': stage,
                 'peh_id': peh_id
-            }
-            dynamo_interface.update_object_metadata_catalog(object_metadata)
+            })
+        dynamo_interface.update_object_metadata_catalog_batch(catalog_items)
 
         # Only uncomment if a queue for the next stage exists
         # logger.info('Sending messages to next SQS queue if it exists')
         # sqs_config = SQSConfiguration(team, dataset, ''.join([stage[:-1], chr(ord(stage[-1]) + 1)]))
         # sqs_interface = SQSInterface(sqs_config.get_stage_queue_name)
-        # sqs_interface.send_batch_messages_to_fifo_queue(processed_keys, 10, '{}-{}'.format(team, dataset))
+        # sqs_interface.send_batch_messages_to_fifo_queue([obj['key'] for obj in processed_objects], 10, '{}-{}'.format(team, dataset))
 
         octagon_client.update_pipeline_execution(
             status="{} {} Processing".format(stage, component), component=component)
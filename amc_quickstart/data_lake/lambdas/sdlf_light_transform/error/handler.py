@@ -25,6 +25,16 @@ def lambda_handler(event, context):
     try:
         if isinstance(event, str):
             event = json.loads(event)
+        if 'messages' in event or 'body' in event:
+            # batched state machine, either the whole batch (execution input) or its failed messages
+            messages = event['messages'] if 'messages' in event else event['body']['failed']
+            for message in messages:
+                sqs_config = SQSConfiguration(
+                    message['team'], message['pipeline'], message['pipeline_stage'])
+                sqs_interface = SQSInterface(sqs_config.get_stage_dlq_name)
+                logger.info('Processing of {} failed. Sending original payload to DLQ'.format(message['key']))
+                sqs_interface.send_message_to_fifo_queue(json.dumps(message), 'failed')
+            return
         sqs_config = SQSConfiguration(
             event['team'], event['pipeline'], event['pipeline_stage'])
         sqs_interface = SQSInterface(sqs_config.get_stage_dlq_name)
@@ -25,6 +25,94 @@ logger = init_logger(__name__)
 
 stage_bucket = os.environ['stage_bucket']
 
+
+def process_batch(body, context):
+    """Updates the S3 objects metadata catalog for a batch of objects, an object failing does not fail the others
+
+    Arguments:
+        body {dict} -- Dictionary with the processed objects and the messages of the objects that failed
+        context {dict} -- Dictionary with details on Lambda context
+
+    Returns:
+        {dict} -- Dictionary with the processed objects and the messages of the objects that failed
+    """
+    items = []
+    failed = list(body['failed'])
+    if not body['items']:
+        return {'statusCode': 200, 'body': {'items': items, 'failed': failed}}
+
+    component = context.function_name.split('-')[-2].title()
+    octagon_client = (
+        octagon.OctagonClient()
+        .with_run_lambda(True)
+        .with_configuration_instance(body['items'][0]['env'])
+        .build()
+    )
+    dynamo_interface = DynamoInterface(DynamoConfiguration())
+    s3_interface = S3Interface()
+
+    # processed keys of the batch, sent to the queue of the next stage of their dataset together
+    next_stage_keys = {}
+    for item in body['items']:
+        stage = item['pipeline_stage']
+        try:
+            peh.PipelineExecutionHistoryAPI(
+                octagon_client).retrieve_pipeline_execution(item['peh_id'])
+            objects_metadata = s3_interface.get_objects_metadata(stage_bucket, item['processedKeys'])
+            catalog_items = []
+            for key in item['processedKeys']:
+                catalog_items.append({
+                    'bucket': stage_bucket,
+                    'key': key,
+                    'size': objects_metadata[key]['size'],
+                    'last_modified_date': objects_metadata[key]['last_modified_date'],
+                    'org': item['org'],
+                    'app': item['app'],
+                    'env': item['env'],
+                    'team': item['team'],
+                    'pipeline': item['pipeline'],
+                    'dataset': item['dataset'],
+                    'stage': 'stage',
+                    'pipeline_stage': stage,
+                    'peh_id': item['peh_id']
+                })
+            dynamo_interface.update_object_metadata_catalog_batch(catalog_items)
+            octagon_client.update_pipeline_execution(status="{} {} Processing".format(stage, component),
+                                                     component=component)
+            items.append(item)
+            next_stage_keys.setdefault((item['team'], item['dataset'], stage), []).extend(item['processedKeys'])
+        except Exception as e:
+            logger.error("Error processing {}".format(item['key']), exc_info=True)
+            octagon_client.end_pipeline_execution_failed(component=component,
+                                                         issue_comment="{} {} Error: {}".format(stage, component,
+                                                                                                repr(e)))
+            failed.append(item)
+
+    logger.info('Sending messages to next SQS queue if it exists')
+    try:
+        for (team, dataset, stage), processed_keys in next_stage_keys.items():
+            sqs_config = SQSConfiguration(team, dataset, ''.join(
+                [stage[:-1], chr(ord(stage[-1]) + 1)]))
+            sqs_interface = SQSInterface(sqs_config.get_stage_queue_name)
+            sqs_interface.send_batch_messages_to_fifo_queue(
+                processed_keys, 10, '{}-{}'.format(team, dataset))
+    except Exception as e:
+        for item in items:
+            peh.PipelineExecutionHistoryAPI(
+                octagon_client).retrieve_pipeline_execution(item['peh_id'])
+            octagon_client.end_pipeline_execution_failed(
+                component=component,
+                issue_comment="{} {} Error: {}".format(item['pipeline_stage'], component, repr(e)))
+        raise e
+
+    for item in items:
+        peh.PipelineExecutionHistoryAPI(
+            octagon_client).retrieve_pipeline_execution(item['peh_id'])
+        octagon_client.end_pipeline_execution_success()
+
+    return {'statusCode': 200, 'body': {'items': items, 'failed': failed}}
+
+
 def lambda_handler(event, context):
     """Updates the S3 objects metadata catalog
 
@@ -35,6 +123,10 @@ def lambda_handler(event, context):
     Returns:
         {dict} -- Dictionary with outcome of the process
     """
+    if 'items' in event['body']:
+        # batched state machine, see the routing lambda
+        return process_batch(event['body'], context)
+
     try:
         logger.info('Fetching event data from previous step')
         processed_keys = event['body']['processedKeys']
@@ -61,12 +153,14 @@ def lambda_handler(event, context):
 
         logger.info('Storing metadata to DynamoDB')
         bucket = stage_bucket
+        objects_metadata = S3Interface().get_objects_metadata(bucket, processed_keys)
+        catalog_items = []
         for key in processed_keys:
-            object_metadata = {
+            catalog_items.append({
                 'bucket': bucket,
                 'key': key,
-                'size': S3Interface().get_size(bucket, key),
-                'last_modified_date': S3Interface().get_last_modified(bucket, key),
+                'size': objects_metadata[key]['size'],
+                'last_modified_date': objects_metadata[key]['last_modified_date'],
                 'org': event['body']['org'],
                 'app': event['body']['app'],
                 'env': event['body']['env'],
@@ -76,9 +170,8 @@ def lambda_handler(event, context):
                 'stage': 'stage',
                 'pipeline_stage': stage,
                 'peh_id': peh_id
-            }
-
-            dynamo_interface.update_object_metadata_catalog(object_metadata)
+            })
+        dynamo_interface.update_object_metadata_catalog_batch(catalog_items)
 
         logger.info('Sending messages to next SQS queue if it exists')
         sqs_config = SQSConfiguration(team, dataset, ''.join(
@@ -23,6 +23,58 @@ from datalake_library.octagon import Artifact, EventReasonEnum, peh
 logger = init_logger(__name__)
 
 
+def process_batch(messages, context):
+    """Updates the objects metadata catalog for a batch of objects, an object failing does not fail the others
+
+    Arguments:
+        messages {list} -- Dictionaries with details on the S3 events
+        context {dict} -- Dictionary with details on Lambda context
+
+    Returns:
+        {dict} -- Dictionary with the objects to process and the messages of the objects that failed
+    """
+    component = context.function_name.split('-')[-2].title()
+    octagon_client = (
+        octagon.OctagonClient()
+        .with_run_lambda(True)
+        .with_configuration_instance(messages[0]['env'])
+        .build()
+    )
+    dynamo_interface = DynamoInterface(DynamoConfiguration())
+
+    items = []
+    failed = []
+    for object_metadata in messages:
+        stage = object_metadata['pipeline_stage']
+        # a redriven message carries the pipeline execution of its previous attempt
+        object_metadata.pop('peh_id', None)
+        try:
+            object_metadata['peh_id'] = octagon_client.start_pipeline_execution(
+                pipeline_name='{}-{}-stage-{}'.format(object_metadata['team'],
+                                                      object_metadata['pipeline'],
+                                                      stage[-1].lower()),
+                comment=json.dumps(object_metadata)
+            )
+            dynamo_interface.update_object_metadata_catalog(object_metadata)
+            octagon_client.update_pipeline_execution(
+                status="{} {} Processing".format(stage, component), component=component)
+            items.append(object_metadata)
+        except Exception as e:
+            logger.error("Error processing {}".format(object_metadata.get('key')), exc_info=True)
+            if 'peh_id' in object_metadata:
+                octagon_client.end_pipeline_execution_failed(
+                    component=component, issue_comment="{} {} Error: {}".format(stage, component, repr(e)))
+            failed.append(object_metadata)
+
+    return {
+        'statusCode': 200,
+        'body': {
+            'items': items,
+            'failed': failed
+        }
+    }
+
+
 def lambda_handler(event, context):
     """Updates the objects metadata catalog
 
@@ -33,6 +85,10 @@ def lambda_handler(event, context):
     Returns:
         {dict} -- Dictionary with Processed Bucket and Key
     """
+    if isinstance(event, dict) and 'messages' in event:
+        # batched state machine, see the routing lambda
+        return process_batch(event['messages'], context)
+
     try:
         logger.info('Fetching event data from previous step')
         object_metadata = json.loads(event)
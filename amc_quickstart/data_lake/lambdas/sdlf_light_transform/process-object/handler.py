@@ -32,6 +32,54 @@ logger = init_logger(__name__)
 #             shutil.rmtree(os.path.join(root, d))
 
 
+def process_batch(body, context):
+    """Calls custom transform developed by user for a batch of objects, an object failing does not fail the others
+
+    Arguments:
+        body {dict} -- Dictionary with the objects to process and the messages of the objects that failed
+        context {dict} -- Dictionary with details on Lambda context
+
+    Returns:
+        {dict} -- Dictionary with the processed objects and their processed keys and the failed messages
+    """
+    items = []
+    failed = list(body['failed'])
+    if not body['items']:
+        return {'statusCode': 200, 'body': {'items': items, 'failed': failed}}
+
+    component = context.function_name.split('-')[-2].title()
+    octagon_client = (
+        octagon.OctagonClient()
+        .with_run_lambda(True)
+        .with_configuration_instance(body['items'][0]['env'])
+        .build()
+    )
+
+    transform_handlers = {}
+    for item in body['items']:
+        stage = item['pipeline_stage']
+        try:
+            peh.PipelineExecutionHistoryAPI(
+                octagon_client).retrieve_pipeline_execution(item['peh_id'])
+
+            transform_key = (item['team'], item['dataset'], stage)
+            if transform_key not in transform_handlers:
+                transform_handlers[transform_key] = TransformHandler().stage_transform(*transform_key)
+            item['processedKeys'] = transform_handlers[transform_key]().transform_object(
+                item['bucket'], item['key'], item['team'], item['dataset'])  # custom user code called
+            octagon_client.update_pipeline_execution(status="{} {} Processing".format(stage, component),
+                                                     component=component)
+            items.append(item)
+        except Exception as e:
+            logger.error("Error processing {}".format(item['key']), exc_info=True)
+            octagon_client.end_pipeline_execution_failed(component=component,
+                                                         issue_comment="{} {} Error: {}".format(stage, component,
+                                                                                                repr(e)))
+            failed.append(item)
+
+    return {'statusCode': 200, 'body': {'items': items, 'failed': failed}}
+
+
 def lambda_handler(event, context):
     """Calls custom transform developed by user
 
@@ -42,6 +90,10 @@ def lambda_handler(event, context):
     Returns:
         {dict} -- Dictionary with Processed Bucket and Key(s)
     """
+    if 'items' in event['body']:
+        # batched state machine, see the routing lambda
+        return process_batch(event['body'], context)
+
     try:
         logger.info('Fetching event data from previous step')
         bucket = event['body']['bucket']
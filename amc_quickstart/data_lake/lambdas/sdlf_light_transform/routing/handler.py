@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import json
+import os
 
 from datalake_library.commons import init_logger
 from datalake_library.configuration.resource_configs import StateMachineConfiguration
@@ -20,10 +21,31 @@ from datalake_library.interfaces.states_interface import StatesInterface
 
 logger = init_logger(__name__)
 
+# true: one execution of the state machine processes all the messages of a stage received together
+BATCH_PROCESSING = os.getenv('BATCH_PROCESSING', 'false').lower() == 'true'
+
+
+def run_batches(records):
+    batches = {}
+    for record in records:
+        event_body = json.loads(record['body'])
+        state_machine = (event_body['team'], event_body['pipeline'], event_body['pipeline_stage'])
+        batches.setdefault(state_machine, []).append(event_body)
+
+    states_interface = StatesInterface()
+    for (team, pipeline, stage), messages in batches.items():
+        logger.info('Starting State Machine Execution for {} messages'.format(len(messages)))
+        state_config = StateMachineConfiguration(team, pipeline, stage)
+        states_interface.run_state_machine(
+            state_config.get_stage_state_machine_arn, {'messages': messages})
+
 
 def lambda_handler(event, context):
     try:
         logger.info('Received {} messages'.format(len(event['Records'])))
+        if BATCH_PROCESSING:
+            run_batches(event['Records'])
+            return
         for record in event['Records']:
             logger.info('Starting State Machine Execution')
             event_body = json.loads(record['body'])
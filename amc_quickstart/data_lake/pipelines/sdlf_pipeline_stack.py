@@ -91,7 +91,8 @@ class SDLFPipelineStack(BaseStack):
             environment_id=self._environment_id,
             config=SDLFLightTransformConfig(
                 team=team,
-                pipeline=pipeline 
+                pipeline=pipeline,
+                batch_processing=True
             ),
         )
         
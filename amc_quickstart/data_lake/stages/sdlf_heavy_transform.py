@@ -296,6 +296,7 @@ class SDLFHeavyTransform(DataStage):
                         "dynamodb:ConditionCheckItem",
                         "dynamodb:DeleteItem",
                         "dynamodb:UpdateItem",
+                        "dynamodb:BatchWriteItem",
                         "dynamodb:GetRecords",
                         "dynamodb:ListTables",
                         "dynamodb:DescribeTable"
@@ -49,6 +49,8 @@ def get_ssm_value(scope, id: str, parameter_name: str) -> str:
 class SDLFLightTransformConfig:
     team: str
     pipeline: str
+    # one state machine execution per batch of queued objects instead of one per object
+    batch_processing: bool = False
 
 
 class SDLFLightTransform(DataStage):
@@ -236,7 +238,8 @@ class SDLFLightTransform(DataStage):
             code=Code.from_asset(os.path.join(f"{Path(__file__).parents[1]}", "lambdas/sdlf_light_transform/routing")),
             handler="handler.lambda_handler",
             environment={
-                "STEPFUNCTION": f"arn:aws:states:{cdk.Aws.REGION}:{cdk.Aws.ACCOUNT_ID}:stateMachine:sdlf-{team}-{pipeline}-sm-a"
+                "STEPFUNCTION": f"arn:aws:states:{cdk.Aws.REGION}:{cdk.Aws.ACCOUNT_ID}:stateMachine:sdlf-{team}-{pipeline}-sm-a",
+                "BATCH_PROCESSING": str(self._config.batch_processing).lower()
             },
             description="Triggers Step Function",
             timeout=cdk.Duration.minutes(1),
@@ -311,6 +314,9 @@ class SDLFLightTransform(DataStage):
             function_name=f"{self._prefix}-{team}-{pipeline}-process-a",
             code=Code.from_asset(os.path.join(f"{Path(__file__).parents[1]}", "lambdas/sdlf_light_transform/process-object")),
             handler="handler.lambda_handler",
+            environment={
+                "LIGHT_TRANSFORM_MODE": "copy"
+            },
             description="executes lights transform",
             timeout=cdk.Duration.minutes(15),
             memory_size=1536,
@@ -420,6 +426,7 @@ class SDLFLightTransform(DataStage):
                         "dynamodb:ConditionCheckItem",
                         "dynamodb:DeleteItem",
                         "dynamodb:UpdateItem",
+                        "dynamodb:BatchWriteItem",
                         "dynamodb:GetRecords",
                         "dynamodb:ListTables",
                         "dynamodb:DescribeTable"
@@ -460,6 +467,82 @@ class SDLFLightTransform(DataStage):
             )
             _lambda_object.add_layers(data_lake_layer_version)
 
+    def _create_batch_state_machine_definition(self) -> Dict[str, Any]:
+        # each lambda processes the whole batch, the messages of the objects that failed are sent to the DLQ
+        # without failing the objects that succeeded
+        return {
+                    "Comment": "Batched pseudo flow",
+                    "StartAt": "Try",
+                    "States": {
+                        "Try": {
+                        "Type": "Parallel",
+                        "Branches": [
+                            {
+                            "StartAt": "Pre-update Comprehensive Catalogue",
+                            "States": {
+                                "Pre-update Comprehensive Catalogue": {
+                                "Type": "Task",
+                                "Resource": self._preupdate_lambda.function_arn,
+                                "Comment": "Pre-update Comprehensive Catalogue",
+                                "Next": "Execute Light Transformation"
+                                },
+                                "Execute Light Transformation": {
+                                "Type": "Task",
+                                "Resource": self._process_lambda.function_arn,
+                                "Comment": "Execute Light Transformation",
+                                "Next": "Post-update comprehensive Catalogue"
+                                },
+                                "Post-update comprehensive Catalogue": {
+                                "Type": "Task",
+                                "Resource": self._postupdate_lambda.function_arn,
+                                "Comment": "Post-update comprehensive Catalogue",
+                                "End": True
+                                }
+                            }
+                            }
+                        ],
+                        "OutputPath": "$[0]",
+                        "Catch": [
+                            {
+                            "ErrorEquals": [ "States.ALL" ],
+                            "ResultPath": None,
+                            "Next": "Error"
+                            }
+                        ],
+                        "Next": "Any Failed Objects"
+                        },
+                        "Any Failed Objects": {
+                        "Type": "Choice",
+                        "Choices": [
+                            {
+                            "Variable": "$.body.failed[0]",
+                            "IsPresent": True,
+                            "Next": "Failed Objects"
+                            }
+                        ],
+                        "Default": "Done"
+                        },
+                        "Failed Objects": {
+                        "Type": "Task",
+                        "Resource": self._error_lambda.function_arn,
+                        "Comment": "Send Payload of Failed Objects to DLQ",
+                        "Next": "Done"
+                        },
+                        "Done": {
+                        "Type": "Succeed"
+                        },
+                        "Error": {
+                        "Type": "Task",
+                        "Resource": self._error_lambda.function_arn,
+                        "Comment": "Send Original Payload to DLQ",
+                        "Next": "Failed"
+                        },
+                        "Failed": {
+                        "Type": "Fail"
+                        }
+                    }
+                    }
+
     def _create_state_machine(self, name) -> None:
         
         definition = {
@@ -518,6 +601,8 @@ class SDLFLightTransform(DataStage):
                         }
                     }
                     }    
+        if self._config.batch_processing:
+            definition = self._create_batch_state_machine_definition()
 
         sfn_role: Role = Role(
             self,
@@ -497,6 +497,8 @@ class FoundationsStack(BaseStack):
             description=f"{self._resource_prefix} Data Lake Library",
             license="Apache-2.0",
         )
+        # the routing lambda parses the AMC result keys with the library
+        self._routing_function.add_layers(data_lake_library_layer)
 
         StringParameter(
             self,
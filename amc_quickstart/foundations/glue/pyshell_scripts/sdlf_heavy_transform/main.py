@@ -16,14 +16,31 @@
 import sys
 import awswrangler as wr
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import logging
-from awsglue.utils import getResolvedOptions
+import collections
+import concurrent.futures
+import contextlib
+import copy
+import functools
 import io
 import re
+import tempfile
+import threading
+import time
 import unicodedata
-from pandas.api.types import is_numeric_dtype, is_string_dtype
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+try:
+    from awsglue.utils import getResolvedOptions
+except ImportError:
+    # awsglue is only available in the Glue runtime, the offline benchmarks import this script without it
+    getResolvedOptions = None
 
 # create logger
 logging.basicConfig()
@@ -44,11 +61,30 @@ def athena_sanitize_name(name: str) -> str:
 print('boto3 version')
 print(boto3.__version__)
 
-glue_client = boto3.client('glue')
-s3 = boto3.resource('s3')
-s3_client = boto3.client('s3')
+# Clients are shared by all the worker threads (boto3 clients are thread safe, resources are not) so their connection
+# pools are sized for concurrent file processing
+client_config = Config(max_pool_connections=50, retries={'max_attempts': 10, 'mode': 'standard'})
+glue_client = boto3.client('glue', config=client_config)
+s3_client = boto3.client('s3', config=client_config)
 lf_client = boto3.client('lakeformation')
 
+# boto3 sessions are not thread safe, awswrangler gets a session per worker thread
+thread_local = threading.local()
+
+# Catalog updates of a table are serialized across worker threads
+table_locks = {}
+table_locks_lock = threading.Lock()
+
+# Table definitions (as returned by glue get_table) read or written by this job run, keyed by (database, table)
+table_definitions = {}
+table_definitions_lock = threading.Lock()
+table_definition_fetch_locks = {}
+
+# Seconds spent per processing phase (parse, infer, cast, encode, upload, catalog) over the job run, summed across
+# the worker threads
+phase_timings = collections.defaultdict(float)
+phase_timings_lock = threading.Lock()
+
 # This map is used to convert Athena datatypes (in upppercase) to pandas Datatypes
 DataTypeMap = {
     "ARRAY": object
@@ -81,8 +117,11 @@ pandas_athena_datatypes = {
     "bool": "boolean"
 }
 
-BooleanValueMap = {"false": 0, "False": 0, "FALSE": 0,
-                   "true": 1, "True": 1, "TRUE": 1, "-1": 0, -1: 0}
+# Literals parsed as booleans by pandas.read_csv
+BooleanLiterals = ["false", "False", "FALSE", "true", "True", "TRUE"]
+
+# Literals converted to True when casting to booleans
+TrueLiterals = ["true", "True", "TRUE"]
 
 column_datatype_override = {
     ".*_fee[s]*($|_.*)": np.float64,
@@ -97,10 +136,138 @@ column_datatype_override = {
     # "[e]*cpa$|.*_[e]*cpa$|.*_[e]*cpa_.*$": np.float64,
 }
 
+# All override expressions combined in a single case insensitive regex, each expression is captured by a named group
+# so the first expression (in column_datatype_override order) matching a column can be looked up from the match
+column_override_expressions = list(column_datatype_override.items())
+column_override_regex = re.compile(
+    '|'.join(f'(?P<override_{index}>{regex_expression_key})'
+             for index, (regex_expression_key, _) in enumerate(column_override_expressions)),
+    re.IGNORECASE)
+
 exclude_workflow = ['standard_impressions_by_browser_family', 'standard_impressions-by-browser-family']
 
+# Optional job arguments, PROCESSING_MODE is one of batch (whole file in memory), streaming (chunked conversion) or
+# auto (streaming for files of at least STREAMING_THRESHOLD_MB), MAX_WORKERS is the number of files processed at a time.
+# Each worker may hold a whole file of up to STREAMING_THRESHOLD_MB (several times that once parsed) in memory, so
+# MAX_WORKERS is only raised together with a lower STREAMING_THRESHOLD_MB, or for jobs given more memory than 1 DPU
+DEFAULT_OPTIONS = {
+    'PROCESSING_MODE': 'auto',
+    'STREAMING_THRESHOLD_MB': '256',
+    'STREAMING_CHUNK_ROWS': '100000',
+    'MAX_WORKERS': '1'
+}
+
+# Number of bytes read from the S3 body at a time in streaming mode
+STREAMING_READ_SIZE = 8 * 1024 * 1024
+
+# Maximum number of partitions per glue BatchCreatePartition call
+PARTITION_BATCH_SIZE = 100
+
+# Parquet outputs of at least 64 MB are uploaded as a multipart upload of 16 MB parts sent in parallel
+transfer_config = TransferConfig(multipart_threshold=64 * 1024 * 1024, multipart_chunksize=16 * 1024 * 1024,
+                                 max_concurrency=8)
+
+
+@contextlib.contextmanager
+def timed_phase(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with phase_timings_lock:
+            phase_timings[phase] += elapsed
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_column_override(column):
+    # Returns the (regex expression, datatype) of the first override matching the column name, None if no override
+    # matches. Results are memoized per column name since the same report columns are seen in every file
+    regex_match = column_override_regex.match(column)
+    if regex_match is None:
+        return None
+    return column_override_expressions[int(regex_match.lastgroup.split('_')[-1])]
+
+
+def get_wrangler_session():
+    if not hasattr(thread_local, 'boto3_session'):
+        thread_local.boto3_session = boto3.Session()
+    return thread_local.boto3_session
+
+
+def get_table_lock(database_name, table_name):
+    with table_locks_lock:
+        return table_locks.setdefault((database_name, table_name), threading.Lock())
+
+
+def get_table_definition(database_name, table_name):
+    # Returns the table definition, the table is only fetched from the catalog on the first lookup of the job run.
+    # Returns None if the table does not exist, misses are not cached since the table may be created afterwards
+    with table_definitions_lock:
+        table_definition = table_definitions.get((database_name, table_name))
+        if table_definition is not None:
+            return table_definition
+        fetch_lock = table_definition_fetch_locks.setdefault((database_name, table_name), threading.Lock())
+
+    # only one worker fetches a given table, the catalog call is made outside table_definitions_lock so lookups of
+    # other tables are not held up by it
+    with fetch_lock:
+        with table_definitions_lock:
+            table_definition = table_definitions.get((database_name, table_name))
+        if table_definition is None:
+            try:
+                table_definition = glue_client.get_table(DatabaseName=database_name, Name=table_name)['Table']
+            except glue_client.exceptions.EntityNotFoundException:
+                return None
+            with table_definitions_lock:
+                # keep the definition written by put_table_definition if the table was updated in the meantime
+                table_definition = table_definitions.setdefault((database_name, table_name), table_definition)
+    return table_definition
+
+
+def put_table_definition(database_name, table_name, table_definition):
+    # Keeps the cached definition in line with the catalog after this job run updates or creates a table
+    with table_definitions_lock:
+        table_definitions[(database_name, table_name)] = table_definition
+
+
+def parquet_table_definition(table_name, path, columns_types, partitions_types, compression, parameters):
+    # Same table definition awswrangler builds in catalog.create_parquet_table
+    return {
+        'Name': table_name,
+        'PartitionKeys': [{'Name': cname, 'Type': dtype} for cname, dtype in partitions_types.items()],
+        'TableType': 'EXTERNAL_TABLE',
+        'Parameters': {'classification': 'parquet', 'compressionType': compression, 'typeOfData': 'file',
+                       **parameters},
+        'StorageDescriptor': {
+            'Columns': [{'Name': cname, 'Type': dtype} for cname, dtype in columns_types.items()],
+            'Location': path,
+            'InputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat',
+            'OutputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat',
+            'Compressed': True,
+            'NumberOfBuckets': -1,
+            'SerdeInfo': {
+                'SerializationLibrary': 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe',
+                'Parameters': {'serialization.format': '1'}
+            },
+            'StoredAsSubDirectories': False,
+            'SortColumns': [],
+            'Parameters': {
+                'CrawlerSchemaDeserializerVersion': '1.0',
+                'classification': 'parquet',
+                'compressionType': compression,
+                'typeOfData': 'file'
+            }
+        }
+    }
+
+
+class PartitionRegistrationError(Exception):
+    """Raised when partitions could not be registered for reasons other than the partition already existing"""
+    pass
+
 
-def add_partitions(outputfilebasepath, silverCatalog, list_partns, targetTableName):
+def get_partition_location(outputfilebasepath, list_partns):
     partn_values = []
     patn_path_value = outputfilebasepath
     for prtns in list_partns:
@@ -108,19 +275,57 @@ def add_partitions(outputfilebasepath, silverCatalog, list_partns, targetTableNa
         partn_values.append(str(prtns["value"]))
     print("Partition S3 Path : " + patn_path_value)
     print(str(partn_values))
-    try:
-        print("Update partitions")
-        wr.catalog.add_parquet_partitions(
-            database=silverCatalog,
-            table=wr.catalog.sanitize_table_name(targetTableName),
-            compression='snappy',
-            partitions_values={
-                patn_path_value: partn_values
-            }
-        )
-    except Exception as e:
-        print("Partition exist No need to update")
-        print(str(e))
+    return patn_path_value, partn_values
+
+
+def parquet_partition_definition(location, values, compression):
+    # Same partition definition awswrangler builds in catalog.add_parquet_partitions
+    return {
+        'StorageDescriptor': {
+            'InputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat',
+            'Location': location,
+            'Compressed': compression is not None,
+            'SerdeInfo': {
+                'Parameters': {'serialization.format': '1'},
+                'SerializationLibrary': 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'
+            },
+            'StoredAsSubDirectories': False,
+            'NumberOfBuckets': -1
+        },
+        'Values': values
+    }
+
+
+def add_partitions(new_partitions):
+    # Registers the partitions collected over the batch, grouped by table, with one BatchCreatePartition call per
+    # PARTITION_BATCH_SIZE partitions. Partitions that already exist are expected and ignored
+    partitions_by_table = {}
+    for partition in new_partitions:
+        if partition is None:
+            continue
+        database_name, table_name, location, values = partition
+        partitions_by_table.setdefault((database_name, table_name), {})[location] = values
+
+    failed_partitions = []
+    for (database_name, table_name), partitions in partitions_by_table.items():
+        print(f"Update {len(partitions)} partitions of {database_name}.{table_name}")
+        partition_inputs = [parquet_partition_definition(location, values, 'snappy')
+                            for location, values in partitions.items()]
+        for index in range(0, len(partition_inputs), PARTITION_BATCH_SIZE):
+            resp = glue_client.batch_create_partition(
+                DatabaseName=database_name,
+                TableName=table_name,
+                PartitionInputList=partition_inputs[index:index + PARTITION_BATCH_SIZE]
+            )
+            for error in resp.get('Errors', []):
+                if error['ErrorDetail']['ErrorCode'] == 'AlreadyExistsException':
+                    continue
+                logger.error(f"could not add partition {error['PartitionValues']} to {database_name}.{table_name}: "
+                             f"{error['ErrorDetail']['ErrorCode']} {error['ErrorDetail']['ErrorMessage']}")
+                failed_partitions.append(f"{database_name}.{table_name}{error['PartitionValues']}")
+
+    if failed_partitions:
+        raise PartitionRegistrationError(f"could not add partitions: {', '.join(failed_partitions)}")
 
 
 def get_partition_values(sourceFilepartitionedPath):
@@ -207,17 +412,17 @@ def add_tags_lf(cust_hash_tag_dict, database_name, table_name):
 def create_update_tbl(csvdf, csv_schema, tbl_schema, silverCatalog, targetTableName, list_partns, outputfilebasepath,
                       table_exist, cust_hash, pandas_athena_datatypes):
     if table_exist == 1:
-        extra_cols = list(set(csv_schema.keys()) - set(tbl_schema.keys()))
-        print("extra_cols : " + str(extra_cols))
-
-        tbl = glue_client.get_table(
-            DatabaseName=silverCatalog,
-            Name=wr.catalog.sanitize_table_name(targetTableName)
-        )
+        tbl = get_table_definition(silverCatalog, wr.catalog.sanitize_table_name(targetTableName))
         print("Existing table")
         print(tbl)
 
-        strg_descrptr = tbl["Table"]["StorageDescriptor"]
+        # compare with the current table columns, another worker may have added columns since tbl_schema was read
+        tbl_columns = set(tblColumn['Name'] for tblColumn in tbl["StorageDescriptor"]["Columns"])
+        extra_cols = list(set(csv_schema.keys()) - tbl_columns)
+        print("extra_cols : " + str(extra_cols))
+
+        # copy the storage descriptor so the cached definition is only changed once the table is updated
+        strg_descrptr = copy.deepcopy(tbl["StorageDescriptor"])
         new_cols = []
         if len(extra_cols) > 0:
             print("Adding new columns")
@@ -236,9 +441,9 @@ def create_update_tbl(csvdf, csv_schema, tbl_schema, silverCatalog, targetTableN
             newtbldetails = {
                 'Name': wr.catalog.sanitize_table_name(targetTableName),
                 'StorageDescriptor': strg_descrptr,
-                'PartitionKeys': tbl["Table"]["PartitionKeys"],
-                'TableType': tbl["Table"]["TableType"],
-                'Parameters': tbl["Table"]["Parameters"]
+                'PartitionKeys': tbl["PartitionKeys"],
+                'TableType': tbl["TableType"],
+                'Parameters': tbl["Parameters"]
             }
 
             print("new table defn")
@@ -251,6 +456,9 @@ def create_update_tbl(csvdf, csv_schema, tbl_schema, silverCatalog, targetTableN
 
             print("new table")
             print(resp)
+
+            put_table_definition(silverCatalog, wr.catalog.sanitize_table_name(targetTableName),
+                                 dict(tbl, StorageDescriptor=strg_descrptr))
         else:
             print("No change in table")
 
@@ -282,297 +490,558 @@ def create_update_tbl(csvdf, csv_schema, tbl_schema, silverCatalog, targetTableN
             columns_types=col_dict,
             partitions_types=part_dict,
             compression='snappy',
-            parameters=cust_hash_tag_dict
+            parameters=cust_hash_tag_dict,
+            boto3_session=get_wrangler_session()
         )
 
+        put_table_definition(silverCatalog, wr.catalog.sanitize_table_name(targetTableName),
+                             parquet_table_definition(wr.catalog.sanitize_table_name(targetTableName),
+                                                      outputfilebasepath, col_dict, part_dict, 'snappy',
+                                                      cust_hash_tag_dict))
+
 
 #        add_tags_lf(cust_hash_tag_dict, silverCatalog, wr.catalog.sanitize_table_name(targetTableName))
 
 
-def process_files(sourceLocations, outputLocation, kms_key, silverCatalog):
-    for key in sourceLocations:  # added for batching
-        logger.info(f"Processing Key: {key}")  # added for batching
-        sourceLocation = key
+class SchemaDriftError(Exception):
+    """Raised when a streamed chunk no longer fits the schema inferred from the sample"""
+    pass
+
+
+class QuoteRewritingStream(io.RawIOBase):
+    """Read-only file object over an S3 body that rewrites \\" to ' while it is read in bounded chunks.
+
+    A trailing backslash is held back until the next chunk arrives so a \\" sequence split across two chunks is
+    still rewritten.
+    """
+
+    def __init__(self, body, read_size):
+        self._body = body
+        self._read_size = read_size
+        self._buffer = b''
+        self._offset = 0
+        self._held_back = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self._offset >= len(self._buffer):
+            data = self._body.read(self._read_size)
+            if not data:
+                if not self._held_back:
+                    return 0
+                data, self._held_back = self._held_back, b''
+            else:
+                data = self._held_back + data
+                if data.endswith(b'\\'):
+                    data, self._held_back = data[:-1], b'\\'
+                else:
+                    self._held_back = b''
+            self._buffer = data.replace(b'\\"', b"'")
+            self._offset = 0
+        size = min(len(b), len(self._buffer) - self._offset)
+        b[:size] = self._buffer[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
+
+def derive_schema(csvdf_unfiltered):
+    # Derive the datatype pandas would infer when parsing each column (bool, int64, float64 or object) in one
+    # vectorized pass over the object typed data instead of parsing the csv text a second time
+    derived_schema = {}
+    for column in csvdf_unfiltered.columns:
+        values = csvdf_unfiltered[column]
+        non_null_values = values.dropna()
+        has_nulls = non_null_values.shape[0] != values.shape[0]
+
+        # columns without any value are parsed as float64 NaN
+        if non_null_values.empty:
+            derived_schema[column] = np.dtype('float64')
+            continue
 
-        sourceBucket, sourceKey = getBucketAndKeyFromS3Uri(sourceLocation)
+        # true/false literals are parsed as booleans unless the column has blanks
+        if non_null_values.isin(BooleanLiterals).all():
+            derived_schema[column] = np.dtype('O') if has_nulls else np.dtype('bool')
+            continue
 
-        s3_resource = boto3.resource('s3')
+        numeric_values = pd.to_numeric(non_null_values, errors='coerce')
+        if numeric_values.isna().any():
+            derived_schema[column] = np.dtype('O')
+        elif numeric_values.dtype.kind in 'iu' and not has_nulls:
+            derived_schema[column] = np.dtype('int64')
+        else:
+            # integers with blanks are parsed as float64 since int64 can not hold NaN
+            derived_schema[column] = np.dtype('float64')
+    return derived_schema
+
+
+def coerce_numeric(values, fill_value=None):
+    # Parse the values as numbers in one vectorized pass, blanks are filled with fill_value (when given) and values
+    # that are not numbers become NaN
+    if fill_value is not None:
+        values = values.fillna(fill_value)
+    return pd.to_numeric(values, errors='coerce')
+
+
+def coerce_boolean(values):
+    # Lookup based conversion to booleans, true literals and positive numbers are True, false literals and blanks are
+    # False. Returns None if a value is neither a boolean literal nor a number since it would silently become False
+    if is_bool_dtype(values):
+        return values
+    if is_numeric_dtype(values):
+        return values > 0
+    if not values.dropna().isin(BooleanLiterals).all():
+        return None
+    return values.isin(TrueLiterals)
+
+
+def coerce_to_datatype(values, datatype, fill_value=None):
+    # Returns the values converted to the datatype (a DataTypeMap or column_datatype_override type), or None if
+    # they can not be represented with it. Values that can not be converted are never silently turned into blanks
+    if datatype == str:
+        return values.astype(str)
+    if datatype == bool:
+        return coerce_boolean(values)
+    if datatype == np.int64:
+        numbers = coerce_numeric(values, fill_value)
+        if numbers.isna().any() or (numbers != np.floor(numbers)).any():
+            return None
+        return numbers.astype('int64')
+    if datatype == np.float64:
+        numbers = coerce_numeric(values, fill_value)
+        if (numbers.isna() & values.notna()).any():
+            return None
+        return numbers.astype('float64')
+    if datatype == np.datetime64:
+        timestamps = pd.to_datetime(values, errors='coerce')
+        if (timestamps.isna() & values.notna()).any():
+            return None
+        return timestamps
+    return values.astype(datatype)
+
+
+def cast_to_derived_schema(csvdf, derived_schema):
+    # Apply the override or derived datatype of every column with a single vectorized conversion per column, columns
+    # holding values that can not be represented with their datatype are kept as strings
+    casted_schema = {}
+    for column in csvdf.columns:
+
+        # Check to see if the column matched an override suffix to force a datatype rather than deriving it
+        column_override = resolve_column_override(column)
+        if column_override is not None:
+            regex_expression_key, override_datatype = column_override
+            # numeric overrides fill blanks with -1
+            casted_values = coerce_to_datatype(csvdf[column], override_datatype,
+                                               -1 if is_numeric_dtype(override_datatype) else None)
+            if casted_values is None:
+                logger.info(f'could not cast {column} to override {override_datatype}, keeping it as string')
+                casted_values = csvdf[column].astype(str)
+            csvdf[column] = casted_values
+            casted_schema[column] = f'{csvdf[column].dtype} (override {regex_expression_key})'
+            continue
 
-        s3_client = boto3.client('s3')
+        derived_datatype = derived_schema.get(column)
+        if derived_datatype is None:
+            continue
 
-        exception = False
-        try:
-            sourceS3Object = s3_resource.Object(sourceBucket, sourceKey).get()
-            logger.info(f"metadata:{sourceS3Object['Metadata']}")
-        except:
-            exception = True
-            pass
-        if exception:
+        casted_values = None
+        if is_bool_dtype(derived_datatype):
+            # false, FALSE, and False end up as False
+            casted_values = coerce_boolean(csvdf[column])
+        elif is_numeric_dtype(derived_datatype):
+            # since we know the column is not a string, fill blanks with -1, the column stays int64 if every value
+            # is an integer and becomes float64 otherwise
+            casted_values = coerce_numeric(csvdf[column], -1)
+            if casted_values.isna().any():
+                casted_values = None
+        if casted_values is None:
+            # Explicitly cast string type columns as string
+            casted_values = csvdf[column].astype(str)
+        csvdf[column] = casted_values
+        casted_schema[column] = f'{csvdf[column].dtype} (derived {derived_datatype})'
+
+    logger.info(f"casted schema : {casted_schema}")
+
+
+def get_table_schema(silverCatalog, targetTableName):
+    # Try to read the schema from the destination table (if it exists), returns the table schema and a flag telling
+    # if the table exists
+    tableSchema = {}
+    # getTableResult = glue_client.get_table(DatabaseName=silverCatalog,Name=targetTableName)
+    tableDefinition = get_table_definition(silverCatalog, athena_sanitize_name(targetTableName))
+    if tableDefinition is None:
+        logger.info(f'destination table {silverCatalog}.{targetTableName} does not exist')
+        return tableSchema, 0
+    logger.info(f"getting schema for table {silverCatalog}.{athena_sanitize_name(targetTableName)}")
+
+    for tableColumn in tableDefinition['StorageDescriptor']['Columns']:
+        tableSchema[tableColumn['Name']] = tableColumn['Type']
+        logger.info(f"table schema : {tableColumn['Name']} : {tableColumn['Type']}")
+    return tableSchema, 1
+
+
+def cast_to_table_schema(csvdf, tableSchema):
+    # convert the CSV dataframe Schema to the schema that was read from the glue table (if it exists)
+    for c in csvdf.columns:
+        if c not in tableSchema:
             continue
-        sourceFilepartitionedPath = sourceS3Object['Metadata']['partitionedpath']
-        sourceFileBaseName = sourceS3Object['Metadata']['filebasename']
-        sourceFileVersion = sourceS3Object['Metadata']['fileversion']
-        sourceFileDataSet = sourceS3Object['Metadata']['keydataset']
-        sourceFileTeam = sourceS3Object['Metadata']['keyteam']
-        sourceFileScheduleFrequency = sourceS3Object['Metadata']['schedulefrequency']
-        sourceFileWorkflowName = sourceS3Object['Metadata']['workflowname']
-
-        # targetTableName = '{}_{}_{}'.format(sourceFileWorkflowName,sourceFileScheduleFrequency,sourceFileVersion)
-        targetTableName = sourceFilepartitionedPath.split('/')[0]
-
-        if sourceFileWorkflowName in exclude_workflow:
+        # look up the datatype from the table in our DataTypeMap (convert the datatype name to uppercase first for
+        # the lookup matching)
+        table_datatype = DataTypeMap[tableSchema[c].upper()]
+        if csvdf[c].dtype == table_datatype:
             continue
+        logger.info(f'{c} datatype in file {csvdf[c].dtype} does not match datatype in table {table_datatype}')
+        if table_datatype == np.int64:
+            casted_values = coerce_to_datatype(csvdf[c].replace('nan', -1), table_datatype, -1)
+        else:
+            # string columns hold blanks as 'nan' since they were cast with astype(str)
+            casted_values = coerce_to_datatype(csvdf[c].replace('nan', np.nan), table_datatype)
+        if casted_values is None:
+            logger.info(f'could not cast {c} to {table_datatype} to match table')
+            continue
+        csvdf[c] = casted_values
+        logger.info(f'casted {c} as {csvdf[c].dtype} to match table')
+
+
+def cast_numbers_to_nullable(csvdf):
+    # If there are blanks in the data integers will be cast to floats which causes inconsistent parquet schema
+    # Convert any whole numbers to Int64 (as opposed to int64) since Int64 can handle nulls
+    for c in csvdf.select_dtypes(np.number).columns:
+        values = csvdf[c].dropna()
+        if values.dtype.kind in 'iu' or (np.isfinite(values) & (values == np.floor(values))).all():
+            csvdf[c] = csvdf[c].astype('Int64')
+            logger.info(f'casted {c} as Int64')
+        else:
+            logger.info(f'could not cast {c} to Int64, it has fractional values')
 
-        # Read the bytes of the csv file once so we can process it with pandas twice, only reading from S3 once.
-        csv_file_data = io.StringIO(sourceS3Object['Body'].read().decode("UTF8").replace('\\"', "'"))
 
-        # create filtered copy of the data that will be used to derive the schema in case there is no filter fields
-        only_unfiltered_csv_file_data = csv_file_data
+def cast_to_target_schema(csvdf, tableSchema, table_exist):
+    if table_exist == 1:
+        cast_to_table_schema(csvdf, tableSchema)
+    else:
+        # apply the generic logic to try to handle schema conversions when the destination table does not exist
+        logger.info('attempting to cast all numbers to Int64 if possible')
+        cast_numbers_to_nullable(csvdf)
+
+
+def find_lost_values(raw_chunk, casted_chunk):
+    # Returns the columns of a chunk where a value that was not blank became blank when it was cast, or became False
+    # without being a false literal, which happens when the chunk does not fit the schema inferred from the sample
+    lost_columns = []
+    for column in casted_chunk.columns:
+        not_blank = raw_chunk[column].notna()
+        lost_values = not_blank & casted_chunk[column].isna()
+        if is_bool_dtype(casted_chunk[column]):
+            lost_values |= not_blank & ~casted_chunk[column] & ~raw_chunk[column].isin(BooleanLiterals)
+        if lost_values.any():
+            lost_columns.append(column)
+    return lost_columns
+
+
+def convert_in_memory(sourceS3Object, key, s3OutputPath, kms_key, silverCatalog, targetTableName):
+    with timed_phase('parse'):
+        # Read the bytes of the csv file once, the schema is derived from the parsed data instead of a second parse
+        csv_file_data = io.StringIO(sourceS3Object['Body'].read().decode("UTF8").replace('\\"', "'"))
 
-        # reload the csv data forcing string (object) datatypes
+        # load the csv data forcing string (object) datatypes
         csvdf = pd.read_csv(csv_file_data, header=0, skip_blank_lines=True, escapechar='\\', dtype=np.dtype('O'))
 
-        # you must reset the buffer location to the beginning after using it in a previous read
-        csv_file_data.seek(0)
+    # close the buffer as we are now done with it
+    csv_file_data.close()
 
-        # Create a boolean flag to track if file has any unfiltered rows
-        has_unfiltered_rows = True
+    # rows used to derive the schema in case there is no filter fields
+    csvdf_only_unfiltered_rows = csvdf
 
-        # If the dataset has a column named filtered check to see how many rows are filtered
-        if 'filtered' in csvdf.columns:
-            csvdf_filtered_rows = csvdf[csvdf.filtered.str.lower() == "true"]
-            # Update the dataset to only include non filtered rows
-            csvdf_only_unfiltered_rows = csvdf[csvdf.filtered.str.lower() != "true"]
+    # If the dataset has a column named filtered check to see how many rows are filtered
+    if 'filtered' in csvdf.columns:
+        filtered_rows_mask = csvdf.filtered.str.lower() == "true"
+        # Update the dataset to only include non filtered rows
+        csvdf_only_unfiltered_rows = csvdf[~filtered_rows_mask]
 
-            # create an out buffer to capture the CSV file output from the to_csv method
-            csv_only_unfiltered_out_buffer = io.BytesIO()
+        # Log the number of filtered and unfiltered rows
+        logger.info(
+            f"input data had {int(filtered_rows_mask.sum())} filtered rows and {csvdf_only_unfiltered_rows.shape[0]} unfiltered rows")
 
-            # write the filtered record set as a CSV into the buffer
-            csvdf_only_unfiltered_rows.to_csv(csv_only_unfiltered_out_buffer)
+    # skip the file if there are no rows left in the df after filtered rows are removed
+    if csvdf_only_unfiltered_rows.shape[0] == 0 and 'filtered' in csvdf.columns:
+        logger.info(f'There were no non-filtered rows in the data file, skipping file {key}')
+        return None
 
-            # Reset the buffer location after it is written to
-            csv_only_unfiltered_out_buffer.seek(0)
+    # Only use unfiltered rows to derive the schema to try to get more accurate data types
+    with timed_phase('infer'):
+        derived_schema = derive_schema(csvdf_only_unfiltered_rows)
 
-            # create copy of the raw string data with only non filtered rows
-            only_unfiltered_csv_file_data = io.StringIO(csv_only_unfiltered_out_buffer.read().decode("UTF8"))
+    with timed_phase('cast'):
+        cast_to_derived_schema(csvdf, derived_schema)
 
-            # reset the string buffer position after it has been written to
-            only_unfiltered_csv_file_data.seek(0)
+    # Convert the CSV inferrred schema to match the table schema
+    with timed_phase('catalog'):
+        tableSchema, table_exist = get_table_schema(silverCatalog, targetTableName)
+    with timed_phase('cast'):
+        cast_to_target_schema(csvdf, tableSchema, table_exist)
 
-            # close the bytes buffer
-            csv_only_unfiltered_out_buffer.close()
+    logger.info(f'Converted Schema: {csvdf.dtypes}\n')
+    logger.info(f'{len(csvdf)} records')
 
-            # Log the number of filtered and unfiltered rows
-            logger.info(
-                f"input data had {csvdf_filtered_rows.shape[0]} filtered rows and {csvdf_only_unfiltered_rows.shape[0]} unfiltered rows")
+    # csvdf.fillna(csvdf.dtypes.replace({'float64': -1.0, 'object': 'FILTERED', 'Int64': -1, 'int64': -1}), inplace=True)
 
-            # has_unfiltered_rows will be true if there is at least 1 row left in the df after filtered rows are removed
-            has_unfiltered_rows = csvdf_only_unfiltered_rows.shape[0] > 0
+    # write the parquet file using the kms key
+    # Note: if writing to parquet and not as a dataset must specify entire path name.
+    out_buffer = io.BytesIO()
+    # print(csvdf.head())
+    # print(csvdf.info(verbose=True))
+    with timed_phase('encode'):
+        csvdf.to_parquet(out_buffer, index=False, compression='snappy')
 
-        if not has_unfiltered_rows:
+    # wr.s3.to_parquet(df=csvdf, path=s3OutputPath, compression='snappy',
+    #                 s3_additional_kwargs={
+    #                     'ServerSideEncryption': 'aws:kms',
+    #                     'SSEKMSKeyId': kms_key})
+
+    outputBucket, outputKey = getBucketAndKeyFromS3Uri(s3OutputPath)
+
+    # upload straight from the buffer (getvalue would copy the whole payload), large outputs go in parallel parts
+    with timed_phase('upload'):
+        out_buffer.seek(0)
+        s3_client.upload_fileobj(out_buffer, outputBucket, outputKey,
+                                 ExtraArgs={'ServerSideEncryption': 'aws:kms', 'SSEKMSKeyId': kms_key},
+                                 Config=transfer_config)
+    out_buffer.close()
+
+    return csvdf, tableSchema, table_exist
+
+
+def convert_streaming(sourceS3Object, key, s3OutputPath, kms_key, silverCatalog, targetTableName, chunk_rows):
+    # Parse the csv file in chunks of chunk_rows rows forcing string (object) datatypes, the schema is inferred from
+    # the first unfiltered rows and every chunk is written as its own parquet row group so memory use only depends
+    # on the chunk size
+    csv_stream = io.BufferedReader(QuoteRewritingStream(sourceS3Object['Body'], STREAMING_READ_SIZE),
+                                   buffer_size=STREAMING_READ_SIZE)
+    csv_reader = pd.read_csv(csv_stream, header=0, skip_blank_lines=True, escapechar='\\', dtype=np.dtype('O'),
+                             chunksize=chunk_rows)
+
+    # Chunks are held back until the first unfiltered row is seen since the schema is derived from unfiltered rows
+    pending_chunks = []
+    derived_schema = None
+    sample_df = None
+    tableSchema = {}
+    table_exist = 0
+    arrow_schema = None
+    writer = None
+    filtered_rows = 0
+    total_rows = 0
+
+    with tempfile.NamedTemporaryFile(suffix='.parquet') as parquet_file:
+        try:
+            while True:
+                with timed_phase('parse'):
+                    chunk = next(csv_reader, None)
+                if chunk is None:
+                    break
+
+                if 'filtered' in chunk.columns:
+                    unfiltered_chunk = chunk[chunk.filtered.str.lower() != "true"]
+                    filtered_rows += chunk.shape[0] - unfiltered_chunk.shape[0]
+                else:
+                    unfiltered_chunk = chunk
+
+                if derived_schema is None:
+                    if unfiltered_chunk.shape[0] == 0:
+                        pending_chunks.append(chunk)
+                        continue
+                    # Only use unfiltered rows of the first chunk to derive the schema to get more accurate data types
+                    with timed_phase('infer'):
+                        derived_schema = derive_schema(unfiltered_chunk)
+                    with timed_phase('catalog'):
+                        tableSchema, table_exist = get_table_schema(silverCatalog, targetTableName)
+
+                pending_chunks.append(chunk)
+                with timed_phase('cast'):
+                    for pending_chunk in pending_chunks:
+                        raw_chunk = pending_chunk.copy()
+                        cast_to_derived_schema(pending_chunk, derived_schema)
+                        cast_to_target_schema(pending_chunk, tableSchema, table_exist)
+                        # values that no longer fit the sampled types would otherwise be written as blanks or False
+                        lost_columns = find_lost_values(raw_chunk, pending_chunk)
+                        if lost_columns:
+                            raise SchemaDriftError(f'values of {lost_columns} do not fit the sampled schema')
+
+                if writer is None:
+                    # the parquet schema is fixed by the first chunk holding unfiltered rows
+                    sample_df = chunk
+                    arrow_schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    logger.info(f'Converted Schema: {chunk.dtypes}\n')
+                    writer = pq.ParquetWriter(parquet_file.name, arrow_schema, compression='snappy')
+
+                with timed_phase('encode'):
+                    for pending_chunk in pending_chunks:
+                        try:
+                            row_group = pa.Table.from_pandas(pending_chunk, schema=arrow_schema, preserve_index=False)
+                        except (pa.ArrowInvalid, pa.ArrowTypeError, ValueError) as e:
+                            raise SchemaDriftError(f'chunk does not match the sampled schema: {str(e)}')
+                        writer.write_table(row_group)
+                        total_rows += pending_chunk.shape[0]
+                pending_chunks = []
+        finally:
+            if writer is not None:
+                writer.close()
+            csv_stream.close()
+
+        logger.info(f"input data had {filtered_rows} filtered rows and {total_rows - filtered_rows} unfiltered rows")
+
+        if writer is None:
             logger.info(f'There were no non-filtered rows in the data file, skipping file {key}')
-            continue
+            return None
 
-        # Only use unfiltered text rows string buffer to derive the schema to try to get more accurate data types
-        df_derived_schema = pd.read_csv(only_unfiltered_csv_file_data, header=0, skip_blank_lines=True, escapechar='\\')
-
-        # close the buffers as we are now done with them
-        only_unfiltered_csv_file_data.close()
-        csv_file_data.close()
-
-        # create a dictionary with the column name as the key and the datatype as the value
-        derived_schema = dict(zip([*df_derived_schema.columns], [*df_derived_schema.dtypes]))
-
-        # create a filtered copy of the dictionary only containing non string (object) dtypes columns that will need
-        # to be cast
-        only_nonstring_schema = dict(filter(lambda elem: elem[1] != np.dtype('O'), derived_schema.items()))
-
-        logger.info(f"only_nonstring_schema : {only_nonstring_schema}")
-
-        # create a filtered copy of the dictionary only containing non string (object) dtypes columns that will need
-        # to be cast
-        only_string_schema = dict(filter(lambda elem: is_string_dtype(elem[1]), derived_schema.items()))
-
-        logger.info(f"only_string_schema : {only_string_schema}")
-
-        # Iterate over the text only columns
-        for column in csvdf.columns:
-
-            # Check to see if the column matched an override suffix to force a datatype rather than deriving it
-            override_matched = False
-            for regex_expression_key in column_datatype_override:
-                regex_match = re.match(regex_expression_key, column, re.IGNORECASE)
-                if regex_match:
-                    override_datatype = column_datatype_override[regex_expression_key]
-                    if is_numeric_dtype(override_datatype):
-                        csvdf[column].fillna(-1, inplace=True)
-                    # if is_string_dtype(override_datatype):
-                    # csvdf[column].fillna('', inplace=True)
-                    csvdf[column] = csvdf[column].astype(override_datatype)
-                    logger.info(
-                        f"column {column} matched override regex expression {regex_expression_key} and was casted to {override_datatype}")
-                    override_matched = True
-            if override_matched:
-                continue
-
-            # If the derived types for the ext column is not a nonstring then fill na with blank string (rather than -1)
-            if column in only_string_schema:
-                # Fill NA values for string type columns with empty strings
-                # csvdf[column].fillna('', inplace=True)
-                # Explicitly cast string type columns as string
-                csvdf[column] = csvdf[column].astype(str)
-                continue
-            # if the column is derived as a nonstring then we need to try to cast it to the appropriate type with rules
-            if column in only_nonstring_schema:
-                derived_datatype_name = only_nonstring_schema[column]
-                # since we know the column is not a string, fill blanks with -1
-                csvdf[column].fillna(-1, inplace=True)
-
-                # if the nonstring column is boolean than map to 0 or 1 values before casting to boolean to ensure that
-                # false, FALSE, and False end up as 0
-                if only_nonstring_schema[column] == bool:
-                    try:
-                        logger.info(f"column {column} is derived as {derived_datatype_name}, "
-                                    f"performing boolean mapping and casting")
-                        csvdf[column] = csvdf[column].map(BooleanValueMap).astype('bool')
-                        continue
-                    except (TypeError, ValueError, KeyError) as e:
-                        logger.info(f'could not cast {column} as {derived_datatype_name} : {e}')
-
-                # Check to see if the derived datatype is numeric
-                if is_numeric_dtype(only_nonstring_schema[column]):
-                    # Convert any derived number columns to Int64 if possible
-                    try:
-                        csvdf[column] = csvdf[column].astype('int64')
-                        logger.info(f'casted {column} derived as {derived_datatype_name} to int64')
-                        # If we cast successfully then go to the next column
-                        continue
-                    except (TypeError, ValueError) as e:
-                        # Log if we are unable to cast to an int64 then note it in the log
-                        logger.info(
-                            f'could not cast {column} derived as {derived_datatype_name} to int64: {str(e)}')
+        logger.info(f'{total_rows} records')
 
-                # Attempt to cast the text to the derived datatype
-                try:
-                    csvdf[column] = csvdf[column].astype(only_nonstring_schema[column])
-                    logger.info(f'casted derived {column} as {derived_datatype_name}')
-                except (TypeError, ValueError) as e:
-                    logger.info(f'could not cast {column} as {derived_datatype_name} : {e}')
+        outputBucket, outputKey = getBucketAndKeyFromS3Uri(s3OutputPath)
 
-        s3OutputPath = f'{outputLocation}/{sourceFilepartitionedPath}/{sourceFileBaseName}.parquet'
+        with timed_phase('upload'):
+            s3_client.upload_file(parquet_file.name, outputBucket, outputKey,
+                                  ExtraArgs={'ServerSideEncryption': 'aws:kms', 'SSEKMSKeyId': kms_key},
+                                  Config=transfer_config)
 
-        # create a dictioary that contains the CSV file's casted schema
-        csvSchema = dict(zip([*csvdf.columns], [*csvdf.dtypes]))
+    return sample_df, tableSchema, table_exist
 
-        # Try to read the schema from the destination table (if it exists) and convert the CSV inferrred schema to
-        # match the table schema
-        table_exist = 1
-        try:
-            glueClient = boto3.client('glue')
-            tableSchema = {}
-            # getTableResult = glueClient.get_table(DatabaseName=silverCatalog,Name=targetTableName)
-            getTableResult = glueClient.get_table(DatabaseName=silverCatalog,
-                                                  Name=athena_sanitize_name(targetTableName))
-            logger.info(f"getting schema for table {silverCatalog}.{athena_sanitize_name(targetTableName)}")
-
-            for tableColumn in getTableResult['Table']['StorageDescriptor']['Columns']:
-                tableSchema[tableColumn['Name']] = tableColumn['Type']
-                logger.info(f"table schema : {tableColumn['Name']} : {tableColumn['Type']}")
-
-            for tableColumn in getTableResult['Table']['StorageDescriptor']['Columns']:
-                tableSchema[tableColumn['Name']] = tableColumn['Type']
-
-            # copy the old csv schema to start the new schema
-            newSchema = csvSchema.copy()
-
-            # if the csv schema column matches an existing table schema column, update the csv schema to match match
-            # the table's schema
-            for column in newSchema:
-                if column in tableSchema:
-                    # look up the datatype from the table in our DataTypeMap (convert the datatype name to uppercase
-                    # first for the lookup matching)
-                    newSchema[column] = DataTypeMap[tableSchema[column].upper()]
-
-            logger.info(f'csvSchema:{csvSchema}')
-            logger.info(f'newSchema:{newSchema}')
-
-            # convert the CSV dataframe Schema to the new schema that was read from the glue table (if it exists)
-            for c in csvdf.columns:
-                if csvdf[c].dtype != newSchema[c]:
-                    logger.info(
-                        f'{c} datatype in file {csvdf[c].dtype} does not match datatype in table {newSchema[c]}')
-                    try:
-                        if newSchema[c] == np.int64:
-                            csvdf[c].fillna(-1, inplace=True)
-                            csvdf[c].replace('nan', -1, inplace=True)
-                        csvdf[c] = csvdf[c].astype(newSchema[c])
-                        logger.info(f'casted {c} as {newSchema[c]} to match table')
-                        print(f"dtype:{csvdf[c].dtype}")
-                        print(f"value is:{csvdf[c]}")
-                    except (TypeError, ValueError) as e:
-                        logger.info(f'could not cast {c} to {newSchema[c]} to match table: {str(e)}')
-
-        # Catch the exception if the table does not exist and apply the generic logic to try to handle schema
-        # conversions
-        except glueClient.exceptions.EntityNotFoundException as e:
-            table_exist = 0
-            logger.info(
-                f'Caught exception, destination table {silverCatalog}.{targetTableName} does not exist, attempting to '
-                f'cast all numbers to Int64 if possible')
-
-            # If there are blanks in the data integers will be cast to floats which causes inconsistent parquet schema
-            # Convert any numbers to Int64 (as opposed to int64) since Int64 can handle nulls
-            for c in csvdf.select_dtypes(np.number).columns:
-                try:
-                    csvdf[c] = csvdf[c].astype('Int64')
-                    logger.info(f'casted {c} as Int64')
-                except (TypeError, ValueError) as e:
-                    logger.info(f'could not cast {c} to Int64: {str(e)}')
 
-        logger.info(f'Converted Schema: {csvdf.dtypes}\n')
-        logger.info(f'{len(csvdf)} records')
+def use_streaming(sourceS3Object, processing_mode, streaming_threshold_mb):
+    if processing_mode == 'streaming':
+        return True
+    if processing_mode == 'auto':
+        return sourceS3Object['ContentLength'] >= streaming_threshold_mb * 1024 * 1024
+    return False
 
-        # csvdf.fillna(csvdf.dtypes.replace({'float64': -1.0, 'object': 'FILTERED', 'Int64': -1, 'int64': -1}), inplace=True)
 
-        # write the parquet file using the kms key
-        # Note: if writing to parquet and not as a dataset must specify entire path name.
-        out_buffer = io.BytesIO()
-        # print(csvdf.head())
-        # print(csvdf.info(verbose=True))
-        csvdf.to_parquet(out_buffer, index=False, compression='snappy')
+def process_file(key, outputLocation, kms_key, silverCatalog, processing_mode='batch', streaming_threshold_mb=256,
+                 chunk_rows=100000):
+    logger.info(f"Processing Key: {key}")  # added for batching
+    sourceLocation = key
 
-        # wr.s3.to_parquet(df=csvdf, path=s3OutputPath, compression='snappy',
-        #                 s3_additional_kwargs={
-        #                     'ServerSideEncryption': 'aws:kms',
-        #                     'SSEKMSKeyId': kms_key})
+    sourceBucket, sourceKey = getBucketAndKeyFromS3Uri(sourceLocation)
 
-        outputBucket, outputKey = getBucketAndKeyFromS3Uri(s3OutputPath)
+    try:
+        sourceS3Object = s3_client.get_object(Bucket=sourceBucket, Key=sourceKey)
+        logger.info(f"metadata:{sourceS3Object['Metadata']}")
+    except:
+        return
+    sourceFilepartitionedPath = sourceS3Object['Metadata']['partitionedpath']
+    sourceFileBaseName = sourceS3Object['Metadata']['filebasename']
+    sourceFileVersion = sourceS3Object['Metadata']['fileversion']
+    sourceFileDataSet = sourceS3Object['Metadata']['keydataset']
+    sourceFileTeam = sourceS3Object['Metadata']['keyteam']
+    sourceFileScheduleFrequency = sourceS3Object['Metadata']['schedulefrequency']
+    sourceFileWorkflowName = sourceS3Object['Metadata']['workflowname']
+
+    # targetTableName = '{}_{}_{}'.format(sourceFileWorkflowName,sourceFileScheduleFrequency,sourceFileVersion)
+    targetTableName = sourceFilepartitionedPath.split('/')[0]
+
+    if sourceFileWorkflowName in exclude_workflow:
+        return
+
+    s3OutputPath = f'{outputLocation}/{sourceFilepartitionedPath}/{sourceFileBaseName}.parquet'
+
+    if use_streaming(sourceS3Object, processing_mode, streaming_threshold_mb):
+        logger.info(f"Converting {sourceS3Object['ContentLength']} bytes in streaming mode, {chunk_rows} rows per chunk")
+        try:
+            result = convert_streaming(sourceS3Object, key, s3OutputPath, kms_key, silverCatalog, targetTableName,
+                                       chunk_rows)
+        except SchemaDriftError as e:
+            # The sample was not representative of the whole file, re-read the object and convert it in memory
+            logger.info(f'{str(e)}, falling back to in memory conversion of {key}')
+            sourceS3Object = s3_client.get_object(Bucket=sourceBucket, Key=sourceKey)
+            result = convert_in_memory(sourceS3Object, key, s3OutputPath, kms_key, silverCatalog, targetTableName)
+    else:
+        result = convert_in_memory(sourceS3Object, key, s3OutputPath, kms_key, silverCatalog, targetTableName)
 
-        s3_client.put_object(Bucket=outputBucket, Key=outputKey, Body=out_buffer.getvalue(),
-                             ServerSideEncryption='aws:kms', SSEKMSKeyId=kms_key)
+    if result is None:
+        return
+    csvdf, tableSchema, table_exist = result
 
-        logger.info(f'Successfully wrote output file to {s3OutputPath}')
+    logger.info(f'Successfully wrote output file to {s3OutputPath}')
 
-        csv_schema = {}
-        for colm in csvdf.columns:
-            csv_schema[colm] = str(csvdf.dtypes[colm])
-        print("Final CSV schema : " + str(csv_schema))
-        print("Table Schema: " + str(tableSchema))
+    csv_schema = {}
+    for colm in csvdf.columns:
+        csv_schema[colm] = str(csvdf.dtypes[colm])
+    print("Final CSV schema : " + str(csv_schema))
+    print("Table Schema: " + str(tableSchema))
 
-        # get partition values
-        list_partns = []
-        cust_hash = ''
-        list_partns, cust_hash = get_partition_values(sourceFilepartitionedPath)
-        print("Partitions values : " + str(list_partns))
+    # get partition values
+    list_partns = []
+    cust_hash = ''
+    list_partns, cust_hash = get_partition_values(sourceFilepartitionedPath)
+    print("Partitions values : " + str(list_partns))
 
-        outputfilebasepath = '{}/{}/'.format(outputLocation, targetTableName)
+    outputfilebasepath = '{}/{}/'.format(outputLocation, targetTableName)
+
+    with get_table_lock(silverCatalog, targetTableName), timed_phase('catalog'):
+        # another worker may have created the table since its schema was read
+        if table_exist == 0:
+            tableSchema, table_exist = get_table_schema(silverCatalog, targetTableName)
 
         # Create or update table
         create_update_tbl(csvdf, csv_schema, tableSchema, silverCatalog, targetTableName, list_partns,
                           outputfilebasepath, table_exist, cust_hash, pandas_athena_datatypes)
 
-        # add partitions
-        add_partitions(outputfilebasepath, silverCatalog, list_partns, targetTableName)
+    # the partition is registered with the partitions of the other files once the whole batch is processed
+    partitionLocation, partitionValues = get_partition_location(outputfilebasepath, list_partns)
+    return silverCatalog, wr.catalog.sanitize_table_name(targetTableName), partitionLocation, partitionValues
+
+
+def process_files(sourceLocations, outputLocation, kms_key, silverCatalog, processing_mode='batch',
+                  streaming_threshold_mb=256, chunk_rows=100000, max_workers=1):
+    # partitions of the processed files, registered in bulk at the end of the batch
+    new_partitions = []
+    file_error = None
+    if max_workers <= 1 or len(sourceLocations) <= 1:
+        for key in sourceLocations:  # added for batching
+            try:
+                new_partitions.append(process_file(key, outputLocation, kms_key, silverCatalog, processing_mode,
+                                                   streaming_threshold_mb, chunk_rows))
+            except Exception as e:
+                # stop at the first failure like before, the files written so far still get their partitions
+                file_error = e
+                break
+    else:
+        # Process up to max_workers files at a time so the S3 and Glue calls of different files overlap
+        logger.info(f"Processing {len(sourceLocations)} files with {max_workers} workers")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(process_file, key, outputLocation, kms_key, silverCatalog, processing_mode,
+                                       streaming_threshold_mb, chunk_rows) for key in sourceLocations]
+            # wait for every file, the files completed after a failure were written and need their partitions too
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    new_partitions.append(future.result())
+                except Exception as e:
+                    logger.error(f"file processing failed: {str(e)}")
+                    if file_error is None:
+                        file_error = e
+
+    # register the partitions of every file written, even when a file failed
+    try:
+        with timed_phase('catalog'):
+            add_partitions(new_partitions)
+    except Exception as e:
+        if file_error is None:
+            raise
+        # the file failure is what failed the job run, the registration failure is only logged
+        logger.error(f"could not register partitions after a file failure: {str(e)}")
+    finally:
+        logger.info(f"phase timings (seconds): {dict(phase_timings)}")
+
+    # re-raise the first file failure so the job run fails like it does when files are processed in turn
+    if file_error is not None:
+        raise file_error
+
+
+def get_optional_options(argv, defaults):
+    # getResolvedOptions fails on arguments that were not passed to the job, only resolve the ones that are present
+    options = dict(defaults)
+    present_options = [name for name in defaults if f'--{name}' in argv]
+    if present_options:
+        options.update(getResolvedOptions(argv, present_options))
+    return options
 
 
 if __name__ == '__main__':
@@ -580,6 +1049,7 @@ if __name__ == '__main__':
         sys.argv,
         ['JOB_NAME', 'SOURCE_LOCATION', 'SOURCE_LOCATIONS', 'OUTPUT_LOCATION', 'SILVER_CATALOG', 'GOLD_CATALOG',
          'KMS_KEY'])
+    options = get_optional_options(sys.argv, DEFAULT_OPTIONS)
 
     jobName = args['JOB_NAME']
     sourceLocation = args['SOURCE_LOCATION']
@@ -589,6 +1059,11 @@ if __name__ == '__main__':
     silverCatalog = args['SILVER_CATALOG']
     goldCatalog = args['GOLD_CATALOG']
     kms_key = args['KMS_KEY']
+    processingMode = options['PROCESSING_MODE'].lower()
+    streamingThresholdMb = int(options['STREAMING_THRESHOLD_MB'])
+    streamingChunkRows = int(options['STREAMING_CHUNK_ROWS'])
+    maxWorkers = int(options['MAX_WORKERS'])
 
     ## Processing the files
-    process_files(sourceLocations, outputLocation, kms_key, silverCatalog)
+    process_files(sourceLocations, outputLocation, kms_key, silverCatalog, processingMode, streamingThresholdMb,
+                  streamingChunkRows, maxWorkers)
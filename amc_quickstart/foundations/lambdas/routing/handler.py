@@ -23,6 +23,8 @@ import boto3
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
 
+from datalake_library.amc_result_key import AmcResultKey
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 sqs = boto3.resource('sqs')
@@ -107,6 +109,13 @@ def lambda_handler(event, context):
         message = parse_s3_event(event)
         message = catalog_item(event, message)
 
+        result_key = AmcResultKey.parse(message['key'])
+        if result_key is not None and result_key.is_amc_ui_result:
+            # the light transform skips the results of queries run from the AMC UI, do not start a pipeline for them
+            logger.info('Workflow name {} appears to be a result from the AMC UI, skipping'.format(
+                result_key.workflow_name))
+            return
+
         if message['stage'] == 'raw':
             team = message['key'].split('/')[0]
             dataset = message['key'].split('/')[1]
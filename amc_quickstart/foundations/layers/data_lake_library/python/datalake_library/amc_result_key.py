@@ -0,0 +1,97 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+
+# workflow=standard_geo_date_summary_V3/schedule=adhoc/2020-02-03T14:01:47.000Z-standard_geo_date_summary.csv
+RESULT_KEY_PATTERN = re.compile(r"workflow=([^/]*)/schedule=([^/]*)/(.*)")
+# workflow names of the results of queries run from the AMC UI
+AMC_UI_WORKFLOW_PATTERN = re.compile(r"analytics-[0-9a-fA-F]{8}-([0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}")
+# 2020-02-03T14:01:47.000Z-standard_geo_date_summary.csv
+TIMESTAMPED_FILE_NAME_PATTERN = re.compile(
+    r"([0-9]{4})-([0-9]{2})-([0-9]{2})T([0-9]{2}):([0-9]{2}):([0-9]{2})\.([0-9]{3})Z-([^\.]*)\.(.*)")
+# 2020-02-04-standard_geo_date_summary_V3-ver2.csv
+DATE_ONLY_FILE_NAME_PATTERN = re.compile(r"([0-9]{4})-([0-9]{2})-([0-9]{2})-([^.]*)\.(.*)")
+FILE_VERSION_PATTERN = re.compile(r".*-(ver[0-9])")
+
+
+class AmcResultKey:
+    def __init__(self, workflow_name, schedule_frequency, file_name):
+        """Fields of the key of a result file delivered by AMC to a customer bucket
+
+        Arguments:
+            workflow_name {string} -- Name of the workflow that produced the file
+            schedule_frequency {string} -- Schedule of the workflow (e.g. adhoc, daily, weekly)
+            file_name {string} -- Name of the file, after the schedule
+        """
+        self.workflow_name = workflow_name
+        self.schedule_frequency = schedule_frequency
+        self.file_name = file_name
+        self.file_year = self.file_month = self.file_day = ''
+        self.file_hour = self.file_minute = self.file_second = self.file_millisecond = ''
+        self.file_basename = self.file_extension = self.file_version = ''
+
+        file_name_parts = TIMESTAMPED_FILE_NAME_PATTERN.match(file_name)
+        if file_name_parts is not None:
+            (self.file_year, self.file_month, self.file_day, self.file_hour, self.file_minute, self.file_second,
+             self.file_millisecond, self.file_basename, self.file_extension) = file_name_parts.groups()
+        else:
+            file_name_parts = DATE_ONLY_FILE_NAME_PATTERN.match(file_name)
+            if file_name_parts is not None:
+                (self.file_year, self.file_month, self.file_day, self.file_basename,
+                 self.file_extension) = file_name_parts.groups()
+
+        version_parts = FILE_VERSION_PATTERN.match(self.file_basename)
+        if version_parts is not None:
+            self.file_version = version_parts.group(1)
+
+    @classmethod
+    def parse(cls, key):
+        """Parses the key of an AMC result file
+
+        Arguments:
+            key {string} -- Key of the object in the AMC bucket
+
+        Returns:
+            AmcResultKey -- Fields of the key, None if the key is not an AMC result key
+        """
+        key_parts = RESULT_KEY_PATTERN.match(key)
+        if key_parts is None:
+            return None
+        return cls(*key_parts.groups())
+
+    @property
+    def is_amc_ui_result(self):
+        return AMC_UI_WORKFLOW_PATTERN.match(self.workflow_name) is not None
+
+    @property
+    def is_csv(self):
+        return self.file_extension.lower() == 'csv' and self.workflow_name != '' and self.schedule_frequency != ''
+
+    def __repr__(self):
+        return 'AmcResultKey({})'.format(
+            ', '.join('{}={!r}'.format(name, value) for name, value in vars(self).items()))
+
+
+def split_stage_key(key):
+    """Splits the key of a stage object written by the light transform
+
+    Arguments:
+        key {string} -- Key of the object, e.g. pre-stage/team/dataset/table/customer_hash=x/.../file.csv
+
+    Returns:
+        tuple -- Table path (stage/team/dataset/table) and partition path of the object
+    """
+    key_parts = key.split('/')
+    return '/'.join(key_parts[:4]), '/'.join(key_parts[4:-1])
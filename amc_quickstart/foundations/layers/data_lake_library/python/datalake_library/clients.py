@@ -0,0 +1,83 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+# Clients and resources built by get_client and get_resource, shared by the interfaces for the life of the
+# Lambda container (or process)
+_clients = {}
+_resources = {}
+_lock = threading.Lock()
+
+
+def _build_config():
+    config = {
+        'max_pool_connections': int(os.getenv('BOTO3_MAX_POOL_CONNECTIONS', '50')),
+        'retries': {
+            'max_attempts': int(os.getenv('BOTO3_MAX_ATTEMPTS', '10')),
+            'mode': os.getenv('BOTO3_RETRY_MODE', 'standard')
+        }
+    }
+    try:
+        return Config(tcp_keepalive=True, **config)
+    except TypeError:
+        # tcp_keepalive is not supported by the botocore version of older runtimes
+        return Config(**config)
+
+
+CLIENT_CONFIG = _build_config()
+
+
+def get_client(service_name):
+    """Returns the boto3 client of a service, built on first use and then reused
+
+    Arguments:
+        service_name {string} -- Name of the AWS service (e.g. s3, ssm)
+
+    Returns:
+        botocore.client.BaseClient -- Client of the service
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = boto3.client(service_name, config=CLIENT_CONFIG)
+                _clients[service_name] = client
+    return client
+
+
+def get_resource(service_name):
+    """Returns the boto3 resource of a service, built on first use and then reused
+
+    Resources are not thread safe, use a resource of your own when calling it from several threads
+
+    Arguments:
+        service_name {string} -- Name of the AWS service (e.g. s3, dynamodb)
+
+    Returns:
+        boto3.resources.base.ServiceResource -- Resource of the service
+    """
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                resource = boto3.resource(service_name, config=CLIENT_CONFIG)
+                _resources[service_name] = resource
+    return resource
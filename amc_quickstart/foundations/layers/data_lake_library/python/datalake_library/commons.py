@@ -13,6 +13,8 @@
 # limitations under the License.
 
 import logging
+import re
+import unicodedata
 
 
 def init_logger(file_name, log_level=None):
@@ -22,3 +24,18 @@ def init_logger(file_name, log_level=None):
     logger = logging.getLogger(file_name)
     logger.setLevel(getattr(logging, log_level))
     return logger
+
+
+def sanitize_table_name(table):
+    """Converts a name to a valid Glue/Athena table name, same as awswrangler's catalog.sanitize_table_name
+
+    Avoids importing awswrangler (and pandas) in Lambdas that only need to build table names
+
+    Arguments:
+        table {string} -- Table name to sanitize
+
+    Returns:
+        string -- Lower case name without accents, non alphanumeric characters are replaced by underscores
+    """
+    table = "".join(c for c in unicodedata.normalize("NFD", table) if unicodedata.category(c) != "Mn")  # strip accents
+    return re.sub("[^A-Za-z0-9_]+", "_", table).lower()
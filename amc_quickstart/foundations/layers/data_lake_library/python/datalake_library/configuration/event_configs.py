@@ -15,8 +15,7 @@
 import os
 from urllib import parse
 
-import boto3
-
+from ..clients import get_client
 from ..commons import init_logger
 
 
@@ -28,7 +27,7 @@ class EventConfig:
         :param event: event JSON object
         """
         self._event = event
-        self._ssm_interface = ssm_interface or boto3.client('ssm')
+        self._ssm_interface = ssm_interface or get_client('ssm')
 
         self.log_level = os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
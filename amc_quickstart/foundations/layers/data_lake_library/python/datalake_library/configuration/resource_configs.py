@@ -14,9 +14,8 @@
 
 import os
 
-import boto3
-
 from .base_config import BaseConfig
+from ..clients import get_client
 from ..commons import init_logger
 
 
@@ -29,7 +28,7 @@ class S3Configuration(BaseConfig):
         """
         self.log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
-        self._ssm = ssm_interface or boto3.client('ssm')
+        self._ssm = ssm_interface or get_client('ssm')
         super().__init__(self.log_level, self._ssm)
 
         self._fetch_from_environment()
@@ -116,7 +115,7 @@ class DynamoConfiguration(BaseConfig):
         """
         self.log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
-        self._ssm = ssm_interface or boto3.client('ssm')
+        self._ssm = ssm_interface or get_client('ssm')
         super().__init__(self.log_level, self._ssm)
 
         self._fetch_from_ssm()
@@ -149,7 +148,7 @@ class SQSConfiguration(BaseConfig):
         """
         self.log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
-        self._ssm = ssm_interface or boto3.client('ssm')
+        self._ssm = ssm_interface or get_client('ssm')
         self._team = team
         self._prefix = prefix
         self._stage = stage
@@ -185,7 +184,7 @@ class StateMachineConfiguration(BaseConfig):
         """
         self.log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
-        self._ssm = ssm_interface or boto3.client('ssm')
+        self._ssm = ssm_interface or get_client('ssm')
         self._team = team
         self._pipeline = pipeline
         self._stage = stage
@@ -213,7 +212,7 @@ class KMSConfiguration(BaseConfig):
         """
         self.log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
-        self._ssm = ssm_interface or boto3.client('ssm')
+        self._ssm = ssm_interface or get_client('ssm')
         self._name = name
         super().__init__(self.log_level, self._ssm)
 
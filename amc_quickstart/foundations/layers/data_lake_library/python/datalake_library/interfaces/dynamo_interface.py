@@ -15,10 +15,10 @@
 import os
 import datetime as dt
 
-import boto3
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
 
+from ..clients import get_resource
 from ..commons import init_logger
 
 
@@ -26,8 +26,7 @@ class DynamoInterface:
     def __init__(self, configuration, log_level=None, dynamodb_resource=None):
         self.log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
-        self.dynamodb_resource = dynamodb_resource or boto3.resource(
-            'dynamodb')
+        self.dynamodb_resource = dynamodb_resource or get_resource('dynamodb')
 
         self._config = configuration
 
@@ -79,6 +78,25 @@ class DynamoInterface:
             round(dt.datetime.utcnow().timestamp()*1000, 0))
         return self.put_item_in_object_metadata_table(item)
 
+    def update_object_metadata_catalog_batch(self, items):
+        """Writes the metadata of several objects with batch writes instead of a put per object
+
+        Arguments:
+            items {list} -- Dictionaries with the metadata of the objects, including their bucket and key
+        """
+        timestamp = int(round(dt.datetime.utcnow().timestamp()*1000, 0))
+        try:
+            # overwrite_by_pkeys drops duplicate ids, a single batch cannot write the same item twice
+            with self.object_metadata_table.batch_writer(overwrite_by_pkeys=['id']) as batch:
+                for item in items:
+                    item['id'] = self.build_id(item['bucket'], item['key'])
+                    item['timestamp'] = timestamp
+                    batch.put_item(Item=item)
+        except ClientError:
+            msg = 'Error writing {} items into {} table'.format(len(items), self.object_metadata_table)
+            self._logger.exception(msg)
+            raise
+
     def put_item_in_object_metadata_table(self, item):
         return self.put_item(self.object_metadata_table, item)
 
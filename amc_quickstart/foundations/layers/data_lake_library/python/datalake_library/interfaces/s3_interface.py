@@ -18,10 +18,10 @@ from datetime import datetime
 from io import StringIO
 from urllib.parse import unquote_plus
 
-import boto3
 from botocore.client import Config
 from botocore.exceptions import ClientError
 
+from ..clients import get_client, get_resource
 from ..commons import init_logger
 from ..datalake_exceptions import ObjectDeleteFailedException
 
@@ -30,8 +30,8 @@ class S3Interface:
     def __init__(self, log_level=None, s3_client=None, s3_resource=None):
         self.log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
-        self._s3_client = s3_client or boto3.client('s3')
-        self._s3_resource = s3_resource or boto3.resource('s3')
+        self._s3_client = s3_client or get_client('s3')
+        self._s3_resource = s3_resource or get_resource('s3')
 
     # def download_object(self, bucket, key):
     #     self._logger.info('Downloading object: {}/{}'.format(bucket, key))
@@ -75,6 +75,49 @@ class S3Interface:
                 keys.append(obj.key)
         return keys
 
+    def list_objects_metadata(self, bucket, keys_path):
+        keys_path = unquote_plus(keys_path)
+        self._logger.info(
+            'Listing objects metadata in: s3://{}/{}'.format(bucket, keys_path))
+        keys_path = keys_path + \
+            '/' if not keys_path.endswith('/') else keys_path
+        objects = []
+        object_paginator = self._s3_client.get_paginator('list_objects_v2')
+        for response in object_paginator.paginate(Bucket=bucket, Prefix=keys_path):
+            for obj in response.get('Contents', []):
+                if obj['Key'][-1] != '/':
+                    objects.append({
+                        'key': obj['Key'],
+                        'size': obj['Size'],
+                        'last_modified_date': obj['LastModified'].isoformat()
+                    })
+        return objects
+
+    def get_objects_metadata(self, bucket, keys):
+        """Gets the size and last modified date of objects, listing the folder of the objects
+        once instead of a HEAD request per object
+
+        Arguments:
+            bucket {string} -- Bucket of the objects
+            keys {list} -- Keys of the objects
+
+        Returns:
+            dict -- Key to dictionary with the key, size and last modified date of the object
+        """
+        keys = set(keys)
+        objects = {}
+        for prefix in sorted({key.rsplit('/', 1)[0] for key in keys if '/' in key}):
+            for obj in self.list_objects_metadata(bucket, prefix):
+                if obj['key'] in keys:
+                    objects[obj['key']] = obj
+        for key in keys - objects.keys():
+            objects[key] = {
+                'key': key,
+                'size': self.get_size(bucket, key),
+                'last_modified_date': self.get_last_modified(bucket, key)
+            }
+        return objects
+
     def read_object(self, bucket, key):
         key = unquote_plus(key)
         self._logger.info("Reading object from {}/{}".format(bucket, key))
@@ -108,7 +151,65 @@ class S3Interface:
             self._logger.exception(msg)
             raise
 
-    def copy_object(self, source_bucket, source_key, dest_bucket, dest_key=None, kms_key=None):
+    def write_object_parts(self, bucket, key, chunks, kms_key=None, metadata=None, part_size=16 * 1024 * 1024):
+        """Writes an object from an iterable of byte chunks, holding at most one part in memory
+
+        The object is written with a single PutObject when the chunks add up to less than
+        part_size, with a multipart upload otherwise
+
+        Arguments:
+            bucket {string} -- Bucket of the object
+            key {string} -- Key of the object
+            chunks {iterable} -- Byte chunks making up the object content
+            kms_key {string} -- KMS key used to encrypt the object
+            metadata {dict} -- User metadata of the object
+            part_size {int} -- Size of the uploaded parts, at least 5 MB
+        """
+        self._logger.info("Writing object parts to {}/{}".format(bucket, key))
+        extra_kwargs = {}
+        if kms_key:
+            extra_kwargs = {
+                "ServerSideEncryption": "aws:kms",
+                "SSEKMSKeyId": kms_key
+            }
+        if metadata is not None:
+            extra_kwargs["Metadata"] = metadata
+
+        upload_id = None
+        parts = []
+        buffer = bytearray()
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                if len(buffer) < part_size:
+                    continue
+                if upload_id is None:
+                    upload_id = self._s3_client.create_multipart_upload(
+                        Bucket=bucket, Key=key, **extra_kwargs)['UploadId']
+                self._upload_part(bucket, key, upload_id, parts, buffer)
+                buffer = bytearray()
+
+            if upload_id is None:
+                self._s3_client.put_object(Bucket=bucket, Key=key, Body=bytes(buffer), **extra_kwargs)
+                return
+            if buffer:
+                self._upload_part(bucket, key, upload_id, parts, buffer)
+            self._s3_client.complete_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts})
+        except Exception:
+            msg = 'Error uploading object: {}/{}'.format(bucket, key)
+            self._logger.exception(msg)
+            if upload_id is not None:
+                self._s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            raise
+
+    def _upload_part(self, bucket, key, upload_id, parts, data):
+        part_number = len(parts) + 1
+        response = self._s3_client.upload_part(
+            Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=bytes(data))
+        parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+
+    def copy_object(self, source_bucket, source_key, dest_bucket, dest_key=None, kms_key=None, metadata=None):
         source_key = unquote_plus(source_key)
         self._logger.info("Copying object {}/{} to {}/{}".format(source_bucket,
                                                                  source_key,
@@ -121,6 +222,10 @@ class S3Interface:
                     "ServerSideEncryption": "aws:kms",
                     "SSEKMSKeyId": kms_key
                 }
+            if metadata is not None:
+                # replace the metadata of the source object, large objects are copied in parts (UploadPartCopy)
+                extra_kwargs["Metadata"] = metadata
+                extra_kwargs["MetadataDirective"] = "REPLACE"
             copy_source = {
                 'Bucket': source_bucket,
                 'Key': source_key
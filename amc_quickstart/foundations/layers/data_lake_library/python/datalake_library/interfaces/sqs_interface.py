@@ -16,9 +16,9 @@ import os
 import math
 import uuid
 
-import boto3
 from botocore.exceptions import ClientError
 
+from ..clients import get_resource
 from ..commons import init_logger
 
 
@@ -26,7 +26,7 @@ class SQSInterface:
     def __init__(self, queue_name, log_level=None, sqs_resource=None):
         self.log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
-        self._sqs_resource = sqs_resource or boto3.resource('sqs')
+        self._sqs_resource = sqs_resource or get_resource('sqs')
 
         self._message_queue = self._sqs_resource.get_queue_by_name(
             QueueName=queue_name)
@@ -16,8 +16,7 @@ import os
 import json
 from datetime import date, datetime
 
-import boto3
-
+from ..clients import get_client
 from ..commons import init_logger
 
 
@@ -26,7 +25,7 @@ class StatesInterface:
     def __init__(self, log_level=None, states_client=None):
         self.log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
         self._logger = init_logger(__name__, self.log_level)
-        self._states_client = states_client or boto3.client('stepfunctions')
+        self._states_client = states_client or get_client('stepfunctions')
 
     @staticmethod
     def json_serial(obj):
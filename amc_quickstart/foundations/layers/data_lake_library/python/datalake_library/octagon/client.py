@@ -17,6 +17,7 @@ import boto3
 import os
 import pkg_resources
 
+from ..clients import get_client, get_resource
 from .config import ConfigParser
 from .metadata import OctagonMetadata
 from .event import EventAPI
@@ -161,10 +162,15 @@ class OctagonClient:
         else:
             boto3.setup_default_session(profile_name=self.profile, region_name=self.region)
 
-        self.account_id = boto3.client("sts").get_caller_identity().get("Account")
-
-        self.dynamodb = boto3.resource("dynamodb")
-        self.sns = boto3.client("sns")
+        if self.run_in_lambda:
+            # reuse the clients of the Lambda container
+            self.account_id = get_client("sts").get_caller_identity().get("Account")
+            self.dynamodb = get_resource("dynamodb")
+            self.sns = get_client("sns")
+        else:
+            self.account_id = boto3.client("sts").get_caller_identity().get("Account")
+            self.dynamodb = boto3.resource("dynamodb")
+            self.sns = boto3.client("sns")
         self.config = ConfigParser(self.configuration_file, self.configuration_instance)
         self.meta = OctagonMetadata(self.metadata_file)
         self.initialized = True
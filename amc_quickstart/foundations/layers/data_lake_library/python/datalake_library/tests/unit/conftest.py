@@ -0,0 +1,52 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# the layer modules import each other as datalake_library.*, the way Lambda finds them under /opt/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+
+# some layer modules create boto3 clients at import time, no AWS call is made by the tests
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+# the workflow management lambdas and their wfm layer are not part of this layer, they are loaded from their files
+WFM_SERVICE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', '..', '..', '..',
+                           'microservices', 'workflow_management_service')
+
+
+@pytest.fixture(scope='session')
+def wfm_layer():
+    wfm_layer_path = os.path.join(WFM_SERVICE, 'lambda-layers', 'wfm-layer', 'python')
+    if wfm_layer_path not in sys.path:
+        sys.path.insert(0, wfm_layer_path)
+
+
+@pytest.fixture(scope='session')
+def load_wfm_handler(wfm_layer):
+    pytest.importorskip('aws_lambda_powertools')
+    handlers = {}
+
+    def load_handler(lambda_name):
+        if lambda_name not in handlers:
+            spec = importlib.util.spec_from_file_location(
+                'wfm_{}'.format(lambda_name), os.path.join(WFM_SERVICE, 'lambdas', lambda_name, 'handler.py'))
+            handlers[lambda_name] = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(handlers[lambda_name])
+        return handlers[lambda_name]
+
+    return load_handler
@@ -0,0 +1,42 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datalake_library.transforms.stage_a_transforms.amc_light_transform import rewrite_escaped_quotes
+
+CSV_DATA = b'campaign,creative\n"a \\"b\\" c",x\\\\"y\n"\\"",z\\'
+
+
+def rewrite_in_chunks(data, size):
+    return b''.join(rewrite_escaped_quotes(data[index:index + size] for index in range(0, len(data), size)))
+
+
+class TestRewriteEscapedQuotes:
+
+    @staticmethod
+    def test_single_chunk():
+        assert b''.join(rewrite_escaped_quotes([CSV_DATA])) == CSV_DATA.replace(b'\\"', b"'")
+
+    @staticmethod
+    def test_escaped_quote_split_across_chunks():
+        # every chunk size puts a chunk boundary between the backslash and the quote of some \"
+        for size in range(1, len(CSV_DATA) + 1):
+            assert rewrite_in_chunks(CSV_DATA, size) == CSV_DATA.replace(b'\\"', b"'")
+
+    @staticmethod
+    def test_trailing_backslash_is_kept():
+        assert b''.join(rewrite_escaped_quotes([b'a\\', b'b\\'])) == b'a\\b\\'
+
+    @staticmethod
+    def test_no_chunks():
+        assert b''.join(rewrite_escaped_quotes([])) == b''
@@ -0,0 +1,69 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from python.datalake_library.amc_result_key import AmcResultKey, split_stage_key
+
+
+class TestAmcResultKey:
+
+    @staticmethod
+    def test_timestamped_file_name():
+        result_key = AmcResultKey.parse(
+            'workflow=standard_geo_date_summary_V3/schedule=adhoc/2020-02-03T14:01:47.123Z-standard_geo-ver2.csv')
+
+        assert result_key.workflow_name == 'standard_geo_date_summary_V3'
+        assert result_key.schedule_frequency == 'adhoc'
+        assert (result_key.file_year, result_key.file_month, result_key.file_day) == ('2020', '02', '03')
+        assert (result_key.file_hour, result_key.file_minute, result_key.file_second) == ('14', '01', '47')
+        assert result_key.file_millisecond == '123'
+        assert result_key.file_basename == 'standard_geo-ver2'
+        assert result_key.file_version == 'ver2'
+        assert result_key.is_csv
+        assert not result_key.is_amc_ui_result
+
+    @staticmethod
+    def test_date_only_file_name():
+        result_key = AmcResultKey.parse(
+            'workflow=standard_geo_date_summary_V3/schedule=weekly/2020-02-04-standard_geo_date_summary_V3.csv')
+
+        assert (result_key.file_year, result_key.file_month, result_key.file_day) == ('2020', '02', '04')
+        assert result_key.file_hour == ''
+        assert result_key.file_basename == 'standard_geo_date_summary_V3'
+        assert result_key.file_version == ''
+        assert result_key.is_csv
+
+    @staticmethod
+    def test_amc_ui_result():
+        result_key = AmcResultKey.parse(
+            'workflow=analytics-0123abcd-0000-1111-2222-0123456789ab/schedule=adhoc/2020-02-04-report.csv')
+
+        assert result_key.is_amc_ui_result
+
+    @staticmethod
+    def test_not_a_result_key():
+        assert AmcResultKey.parse('engineering/legislators/persons.json') is None
+
+    @staticmethod
+    def test_unknown_file_name():
+        result_key = AmcResultKey.parse('workflow=standard_geo/schedule=adhoc/report.json')
+
+        assert result_key.file_extension == ''
+        assert not result_key.is_csv
+
+    @staticmethod
+    def test_split_stage_key():
+        assert split_stage_key('pre-stage/amc/amc/amc_standard_geo_adhoc/customer_hash=abc/export_year=2020/'
+                               'export_month=02/file_last_modified=2020-02-03T14-01-47/report.csv') == (
+            'pre-stage/amc/amc/amc_standard_geo_adhoc',
+            'customer_hash=abc/export_year=2020/export_month=02/file_last_modified=2020-02-03T14-01-47')
@@ -0,0 +1,230 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib.util
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+# the heavy transform Glue script is not part of the layer, it is loaded from its file like the benchmarks do
+GLUE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', '..', '..', 'glue',
+                           'pyshell_scripts', 'sdlf_heavy_transform', 'main.py')
+
+
+@pytest.fixture(scope='module')
+def heavy_transform():
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    spec = importlib.util.spec_from_file_location('sdlf_heavy_transform', GLUE_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def object_series(values):
+    return pd.Series(values, dtype=np.dtype('O'))
+
+
+class FakeBody:
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, amt=None):
+        return self._stream.read(-1 if amt is None else amt)
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Config=None):
+        with open(Filename, 'rb') as f:
+            self.objects[(Bucket, Key)] = f.read()
+
+
+class FakeGlueClient:
+    class exceptions:
+        class EntityNotFoundException(Exception):
+            pass
+
+    def get_table(self, DatabaseName, Name):
+        raise self.exceptions.EntityNotFoundException(Name)
+
+
+@pytest.fixture
+def streaming_clients(heavy_transform, monkeypatch):
+    s3_client = FakeS3Client()
+    monkeypatch.setattr(heavy_transform, 's3_client', s3_client)
+    monkeypatch.setattr(heavy_transform, 'glue_client', FakeGlueClient())
+    return s3_client
+
+
+def convert_streaming(heavy_transform, csv_text, chunk_rows):
+    return heavy_transform.convert_streaming({'Body': FakeBody(csv_text.encode())}, 'key',
+                                             's3://bucket/report.parquet', 'kms-key', 'silver', 'report', chunk_rows)
+
+
+class TestDeriveSchema:
+
+    @staticmethod
+    def test_derived_datatypes(heavy_transform):
+        csvdf = pd.DataFrame({
+            'flag': ['true', 'False', 'TRUE'],
+            'flag_with_blanks': ['true', None, 'false'],
+            'clicks': ['1', '2', '3'],
+            'clicks_with_blanks': ['1', None, '3'],
+            'spend': ['1.5', '2', '3'],
+            'campaign': ['a', '2', '3'],
+            'empty': [None, None, None]
+        }, dtype=np.dtype('O'))
+
+        derived_schema = heavy_transform.derive_schema(csvdf)
+
+        assert derived_schema == {
+            'flag': np.dtype('bool'),
+            'flag_with_blanks': np.dtype('O'),
+            'clicks': np.dtype('int64'),
+            'clicks_with_blanks': np.dtype('float64'),
+            'spend': np.dtype('float64'),
+            'campaign': np.dtype('O'),
+            'empty': np.dtype('float64')
+        }
+
+
+class TestCoercion:
+
+    @staticmethod
+    def test_coerce_boolean_literals(heavy_transform):
+        values = heavy_transform.coerce_boolean(object_series(['true', 'FALSE', None, 'True']))
+
+        assert values.tolist() == [True, False, False, True]
+
+    @staticmethod
+    def test_coerce_boolean_numbers(heavy_transform):
+        values = heavy_transform.coerce_boolean(pd.Series([1, 0, -1]))
+
+        assert values.tolist() == [True, False, False]
+
+    @staticmethod
+    def test_coerce_boolean_rejects_other_values(heavy_transform):
+        assert heavy_transform.coerce_boolean(object_series(['true', 'maybe'])) is None
+
+    @staticmethod
+    def test_coerce_int64(heavy_transform):
+        values = heavy_transform.coerce_to_datatype(object_series(['1', None, '3']), np.int64, -1)
+
+        assert values.dtype == np.dtype('int64')
+        assert values.tolist() == [1, -1, 3]
+
+    @staticmethod
+    def test_coerce_int64_rejects_fractions_and_text(heavy_transform):
+        assert heavy_transform.coerce_to_datatype(object_series(['1', '2.5']), np.int64, -1) is None
+        assert heavy_transform.coerce_to_datatype(object_series(['1', 'abc']), np.int64, -1) is None
+
+    @staticmethod
+    def test_coerce_float64_keeps_blanks(heavy_transform):
+        values = heavy_transform.coerce_to_datatype(object_series(['1.5', None]), np.float64)
+
+        assert values.dtype == np.dtype('float64')
+        assert values[0] == 1.5
+        assert np.isnan(values[1])
+
+    @staticmethod
+    def test_coerce_float64_rejects_text(heavy_transform):
+        assert heavy_transform.coerce_to_datatype(object_series(['1.5', 'abc']), np.float64) is None
+
+    @staticmethod
+    def test_coerce_datetime64(heavy_transform):
+        values = heavy_transform.coerce_to_datatype(object_series(['2022-01-02', None]), np.datetime64)
+
+        assert values[0] == pd.Timestamp('2022-01-02')
+        assert pd.isna(values[1])
+        assert heavy_transform.coerce_to_datatype(object_series(['2022-01-02', 'soon']), np.datetime64) is None
+
+    @staticmethod
+    def test_cast_to_derived_schema_keeps_unrepresentable_values_as_strings(heavy_transform):
+        csvdf = pd.DataFrame({
+            'flag': ['true', 'maybe'],
+            'clicks': ['1', 'abc'],
+            'total_cost': ['1.5', 'n/a']
+        }, dtype=np.dtype('O'))
+        derived_schema = {'flag': np.dtype('bool'), 'clicks': np.dtype('int64'), 'total_cost': np.dtype('O')}
+
+        heavy_transform.cast_to_derived_schema(csvdf, derived_schema)
+
+        assert csvdf['flag'].tolist() == ['true', 'maybe']
+        assert csvdf['clicks'].tolist() == ['1', 'abc']
+        assert csvdf['total_cost'].tolist() == ['1.5', 'n/a']
+
+    @staticmethod
+    def test_cast_to_table_schema_blanks(heavy_transform):
+        csvdf = pd.DataFrame({'spend': ['1.5', 'nan'], 'flag': ['true', 'nan']}, dtype=np.dtype('O'))
+
+        heavy_transform.cast_to_table_schema(csvdf, {'spend': 'double', 'flag': 'boolean'})
+
+        assert csvdf['spend'].dtype == np.dtype('float64')
+        assert csvdf['flag'].tolist() == [True, False]
+
+
+class TestConvertStreaming:
+
+    @staticmethod
+    def test_chunks_matching_the_sample(heavy_transform, streaming_clients):
+        convert_streaming(heavy_transform, 'flag,clicks,campaign\ntrue,1,a\nfalse,2,b\nTRUE,3,c\n', 2)
+
+        table = pq.read_table(io.BytesIO(streaming_clients.objects[('bucket', 'report.parquet')]))
+        assert table.num_rows == 3
+        assert table.column('flag').to_pylist() == [True, False, True]
+        assert table.column('clicks').to_pylist() == [1, 2, 3]
+
+    @staticmethod
+    def test_boolean_drift_is_detected(heavy_transform, streaming_clients):
+        with pytest.raises(heavy_transform.SchemaDriftError):
+            convert_streaming(heavy_transform, 'flag\ntrue\nfalse\nmaybe\nyes\n', 2)
+
+    @staticmethod
+    def test_numeric_drift_is_detected(heavy_transform, streaming_clients):
+        with pytest.raises(heavy_transform.SchemaDriftError):
+            convert_streaming(heavy_transform, 'code\n1\n2\nabc\nxyz\n', 2)
+
+    @staticmethod
+    def test_find_lost_values(heavy_transform):
+        raw_chunk = pd.DataFrame({'flag': ['true', 'maybe', None], 'code': ['1', 'abc', None]}, dtype=np.dtype('O'))
+        casted_chunk = pd.DataFrame({'flag': [True, False, False], 'code': pd.array([1, None, None], dtype='Int64')})
+
+        assert heavy_transform.find_lost_values(raw_chunk, casted_chunk) == ['flag', 'code']
+        assert heavy_transform.find_lost_values(raw_chunk.iloc[[0, 2]], casted_chunk.iloc[[0, 2]]) == []
+
+
+class TestQuoteRewritingStream:
+
+    @staticmethod
+    def test_escaped_quote_split_across_reads(heavy_transform):
+        csv_data = b'campaign,creative\n"a \\"b\\" c",x\\\\"y\n"\\"",z\\'
+        # every read size puts a read boundary between the backslash and the quote of some \"
+        for read_size in range(1, len(csv_data) + 1):
+            stream = heavy_transform.QuoteRewritingStream(FakeBody(csv_data), read_size)
+
+            assert io.BufferedReader(stream, buffer_size=4).read() == csv_data.replace(b'\\"', b"'")
+
+    @staticmethod
+    def test_parsed_by_read_csv(heavy_transform):
+        stream = heavy_transform.QuoteRewritingStream(FakeBody(b'campaign,clicks\n"a \\"b\\"",1\n'), 3)
+
+        csvdf = pd.read_csv(io.BufferedReader(stream), escapechar='\\', dtype=np.dtype('O'))
+
+        assert csvdf['campaign'].tolist() == ["a 'b'"]
@@ -0,0 +1,48 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ast
+import os
+
+import pytest
+
+# the stages are CDK constructs, their policy statements are read from the source so no synth is needed
+STAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', '..', '..', '..',
+                      'data_lake', 'stages')
+
+
+def policy_statement_actions(stage_file_name):
+    with open(os.path.join(STAGES, stage_file_name)) as f:
+        tree = ast.parse(f.read())
+    statements = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, 'id', None) == 'PolicyStatement':
+            for keyword in node.keywords:
+                if keyword.arg == 'actions':
+                    statements.append([ast.literal_eval(action) for action in keyword.value.elts])
+    return statements
+
+
+class TestStagePolicies:
+
+    @staticmethod
+    @pytest.mark.parametrize('stage_file_name', ['sdlf_heavy_transform.py', 'sdlf_light_transform.py'])
+    def test_catalog_writers_can_batch_write(stage_file_name):
+        # the post-update Lambdas write the object metadata catalog with DynamoInterface batch writes
+        catalog_statements = [actions for actions in policy_statement_actions(stage_file_name)
+                              if 'dynamodb:PutItem' in actions]
+
+        assert catalog_statements
+        for actions in catalog_statements:
+            assert 'dynamodb:BatchWriteItem' in actions
@@ -0,0 +1,91 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from botocore.credentials import ReadOnlyCredentials
+
+
+@pytest.fixture(scope='module')
+def amc_api_client(wfm_layer):
+    from wfm import amc_api_client
+    return amc_api_client
+
+
+class FakeCredentials:
+    """Refreshable credentials, rotated by assigning their frozen credentials"""
+
+    def __init__(self):
+        self.frozen_credentials = ReadOnlyCredentials('AKID1', 'secret1', None)
+        self.sessions = []
+
+    def get_frozen_credentials(self):
+        return self.frozen_credentials
+
+
+@pytest.fixture
+def credentials(amc_api_client, monkeypatch):
+    credentials = FakeCredentials()
+
+    class FakeSession:
+        def __init__(self):
+            credentials.sessions.append(self)
+
+        def get_credentials(self):
+            return credentials
+
+    monkeypatch.setattr(amc_api_client, 'Session', FakeSession)
+    return credentials
+
+
+class TestAmcApiClient:
+
+    @staticmethod
+    def test_signer_is_reused_until_the_credentials_are_rotated(amc_api_client, credentials):
+        client = amc_api_client.AmcApiClient()
+
+        signer = client.get_signer('us-east-1')
+        assert client.get_signer('us-east-1') is signer
+
+        credentials.frozen_credentials = ReadOnlyCredentials('AKID2', 'secret2', None)
+        rotated_signer = client.get_signer('us-east-1')
+
+        assert rotated_signer is not signer
+        assert rotated_signer.credentials.access_key == 'AKID2'
+        assert len(credentials.sessions) == 1
+
+    @staticmethod
+    def test_signer_per_region(amc_api_client, credentials):
+        client = amc_api_client.AmcApiClient()
+
+        assert client.get_signer('us-east-1') is not client.get_signer('eu-west-1')
+        assert client.get_signer('eu-west-1')._region_name == 'eu-west-1'
+
+    @staticmethod
+    def test_signed_headers(amc_api_client, credentials):
+        client = amc_api_client.AmcApiClient()
+
+        headers = client.get_signed_headers('post', 'https://amc.example.com/prod/workflowExecutions', 'us-east-1',
+                                            '{}')
+
+        assert headers['Authorization'].startswith('AWS4-HMAC-SHA256 Credential=AKID1/')
+        assert '/us-east-1/execute-api/aws4_request' in headers['Authorization']
+
+    @staticmethod
+    def test_client_is_shared(amc_api_client, monkeypatch):
+        monkeypatch.setattr(amc_api_client, '_amc_api_client', None)
+
+        client = amc_api_client.get_amc_api_client()
+
+        assert isinstance(client, amc_api_client.AmcApiClient)
+        assert amc_api_client.get_amc_api_client() is client
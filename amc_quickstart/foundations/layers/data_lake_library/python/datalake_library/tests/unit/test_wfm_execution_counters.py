@@ -0,0 +1,247 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def counter(load_wfm_handler):
+    return load_wfm_handler('execution_concurrency_counter')
+
+
+@pytest.fixture(scope='module')
+def consumer(load_wfm_handler):
+    return load_wfm_handler('workflow_queue_consumer')
+
+
+def stream_record(customer_id, old_status=None, new_status=None, sequence_number=1):
+    record = {'dynamodb': {'Keys': {'customerId': {'S': customer_id}}, 'SequenceNumber': str(sequence_number)}}
+    if old_status is not None:
+        record['dynamodb']['OldImage'] = {'executionStatus': {'S': old_status}}
+    if new_status is not None:
+        record['dynamodb']['NewImage'] = {'executionStatus': {'S': new_status}}
+    return record
+
+
+class FakeDynamoDB:
+    """Counter table of a single customer, with the conditional put of the reconcile"""
+
+    class exceptions:
+        class ConditionalCheckFailedException(Exception):
+            pass
+
+    def __init__(self, item=None, changed_before_put=None):
+        self.item = item
+        self.changed_before_put = changed_before_put
+        self.puts = []
+
+    def get_item(self, TableName, Key, ConsistentRead):
+        return {} if self.item is None else {'Item': dict(self.item)}
+
+    def put_item(self, TableName, Item, ConditionExpression, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None):
+        if self.changed_before_put is not None:
+            # a stream ADD lands between the read and the reconcile
+            self.item = dict(self.item or {}, **self.changed_before_put)
+        if self.item is None:
+            matches = ConditionExpression == 'attribute_not_exists(customerId)'
+        else:
+            matches = True
+            for condition in ConditionExpression.split(' AND '):
+                if condition.startswith('attribute_not_exists('):
+                    matches &= ExpressionAttributeNames[condition[len('attribute_not_exists('):-1]] not in self.item
+                else:
+                    name, value = condition.split(' = ')
+                    matches &= self.item.get(ExpressionAttributeNames[name]) == ExpressionAttributeValues[value]
+        if not matches:
+            raise self.exceptions.ConditionalCheckFailedException()
+        self.puts.append(Item)
+        self.item = Item
+
+
+class FakeCounterTable:
+    """Counter items updated by the stream, with the sequence number condition of the counter updates"""
+
+    class exceptions:
+        class ConditionalCheckFailedException(Exception):
+            pass
+
+    def __init__(self, failing_customer_ids=()):
+        self.items = {}
+        self.failing_customer_ids = set(failing_customer_ids)
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression, ExpressionAttributeNames,
+                    ExpressionAttributeValues):
+        customer_id = Key['customerId']['S']
+        if customer_id in self.failing_customer_ids:
+            self.failing_customer_ids.remove(customer_id)
+            raise Exception('ProvisionedThroughputExceededException')
+        item = self.items.setdefault(customer_id, {})
+        last_sequence_number = int(ExpressionAttributeValues[':lastSequenceNumber']['N'])
+        if item.get('lastSequenceNumber', -1) >= last_sequence_number:
+            raise self.exceptions.ConditionalCheckFailedException()
+        item['lastSequenceNumber'] = last_sequence_number
+        for name, counter in ExpressionAttributeNames.items():
+            if counter != 'lastSequenceNumber':
+                item[counter] = item.get(counter, 0) + int(ExpressionAttributeValues[':' + name[1:]]['N'])
+
+
+def counters_item(running, pending, reconciled_seconds_ago=0):
+    return {
+        'customerId': {'S': 'c1'},
+        'executionsRunning': {'N': str(running)},
+        'executionsPending': {'N': str(pending)},
+        'reconciledTime': {'N': str(int(time.time()) - reconciled_seconds_ago)}
+    }
+
+
+@pytest.fixture
+def execution_counters(consumer, monkeypatch):
+    def setup(dynamodb, counted=(0, 0)):
+        counts = []
+
+        def count_running_and_pending_executions(customer_config):
+            counts.append(customer_config['customerId'])
+            return counted
+
+        monkeypatch.setattr(consumer, 'EXECUTION_CONCURRENCY_DYNAMODB_TABLE', 'counters')
+        monkeypatch.setattr(consumer.boto3, 'client', lambda service_name: dynamodb)
+        monkeypatch.setattr(consumer, 'count_running_and_pending_executions', count_running_and_pending_executions)
+        return counts
+
+    return setup
+
+
+class TestCounterChanges:
+
+    @staticmethod
+    def test_status_transitions(counter):
+        changes = counter.get_counter_changes([
+            stream_record('c1', new_status='PENDING'),
+            stream_record('c1', 'PENDING', 'RUNNING'),
+            stream_record('c1', 'RUNNING', 'SUCCEEDED'),
+            stream_record('c2', new_status='RUNNING'),
+            stream_record('c2', 'RUNNING', 'RUNNING')
+        ])
+
+        assert {customer_id: dict(customer_changes) for customer_id, customer_changes in changes.items()} == {
+            'c1': {'executionsPending': 0, 'executionsRunning': 0},
+            'c2': {'executionsRunning': 1}
+        }
+
+    @staticmethod
+    def test_uncounted_statuses_and_records_without_images(counter):
+        changes = counter.get_counter_changes([
+            stream_record('c1', 'SUCCEEDED', 'FAILED'),
+            stream_record('c1', old_status='RUNNING'),
+            {'eventName': 'REMOVE'}
+        ])
+
+        assert {customer_id: dict(customer_changes) for customer_id, customer_changes in changes.items()} == {
+            'c1': {'executionsRunning': -1}
+        }
+
+
+class TestCounterUpdates:
+
+    @staticmethod
+    def test_retried_batch_is_counted_once(counter, monkeypatch):
+        table = FakeCounterTable(failing_customer_ids=['c2'])
+        monkeypatch.setattr(counter, 'dynamodb', table)
+        monkeypatch.setenv('EXECUTION_CONCURRENCY_DYNAMODB_TABLE', 'counters')
+        records = [
+            stream_record('c1', new_status='PENDING', sequence_number=100),
+            stream_record('c2', new_status='RUNNING', sequence_number=101),
+            stream_record('c1', 'PENDING', 'RUNNING', sequence_number=102)
+        ]
+
+        with pytest.raises(RuntimeError):
+            counter.lambda_handler({'Records': records}, None)
+        counter.lambda_handler({'Records': records}, None)
+
+        assert table.items == {
+            'c1': {'lastSequenceNumber': 102, 'executionsRunning': 1},
+            'c2': {'lastSequenceNumber': 101, 'executionsRunning': 1}
+        }
+
+    @staticmethod
+    def test_later_records_are_counted(counter, monkeypatch):
+        table = FakeCounterTable()
+        monkeypatch.setattr(counter, 'dynamodb', table)
+        monkeypatch.setenv('EXECUTION_CONCURRENCY_DYNAMODB_TABLE', 'counters')
+
+        counter.lambda_handler({'Records': [stream_record('c1', new_status='RUNNING', sequence_number=100)]}, None)
+        counter.lambda_handler({'Records': [stream_record('c1', 'RUNNING', 'SUCCEEDED', sequence_number=200)]}, None)
+
+        assert table.items['c1'] == {'lastSequenceNumber': 200, 'executionsRunning': 0}
+
+
+class TestExecutionCounters:
+
+    @staticmethod
+    def test_counters_are_used_when_recently_reconciled(consumer, execution_counters):
+        dynamodb = FakeDynamoDB(counters_item(3, 2))
+        counts = execution_counters(dynamodb)
+
+        assert consumer.get_execution_counters({'customerId': 'c1'}) == (3, 2)
+        assert counts == []
+
+    @staticmethod
+    def test_missing_counters_are_reconciled(consumer, execution_counters):
+        dynamodb = FakeDynamoDB()
+        execution_counters(dynamodb, counted=(4, 1))
+
+        assert consumer.get_execution_counters({'customerId': 'c1'}) == (4, 1)
+        assert dynamodb.item['executionsRunning'] == {'N': '4'}
+        assert dynamodb.item['executionsPending'] == {'N': '1'}
+
+    @staticmethod
+    def test_stale_counters_are_reconciled(consumer, execution_counters):
+        dynamodb = FakeDynamoDB(counters_item(9, 9, consumer.EXECUTION_COUNTERS_RECONCILE_SECONDS + 60))
+        execution_counters(dynamodb, counted=(2, 1))
+
+        assert consumer.get_execution_counters({'customerId': 'c1'}) == (2, 1)
+        assert dynamodb.item['executionsRunning'] == {'N': '2'}
+
+    @staticmethod
+    def test_reconcile_keeps_counters_changed_since_the_read(consumer, execution_counters):
+        dynamodb = FakeDynamoDB(counters_item(9, 9, consumer.EXECUTION_COUNTERS_RECONCILE_SECONDS + 60),
+                                changed_before_put={'executionsRunning': {'N': '10'}})
+        execution_counters(dynamodb, counted=(2, 1))
+
+        assert consumer.get_execution_counters({'customerId': 'c1'}) == (2, 1)
+        assert dynamodb.puts == []
+        assert dynamodb.item['executionsRunning'] == {'N': '10'}
+
+    @staticmethod
+    def test_counters_at_zero_are_checked_against_a_count(consumer, execution_counters):
+        dynamodb = FakeDynamoDB(counters_item(0, -1))
+        counts = execution_counters(dynamodb, counted=(2, 1))
+
+        assert consumer.get_execution_counters({'customerId': 'c1'}) == (2, 1)
+        assert counts == ['c1']
+        assert dynamodb.puts == []
+
+    @staticmethod
+    def test_reconcile_keeps_the_last_sequence_number(consumer, execution_counters):
+        item = dict(counters_item(9, 9, consumer.EXECUTION_COUNTERS_RECONCILE_SECONDS + 60),
+                    lastSequenceNumber={'N': '102'})
+        dynamodb = FakeDynamoDB(item)
+        execution_counters(dynamodb, counted=(2, 1))
+
+        assert consumer.get_execution_counters({'customerId': 'c1'}) == (2, 1)
+        assert dynamodb.item['executionsRunning'] == {'N': '2'}
+        assert dynamodb.item['lastSequenceNumber'] == {'N': '102'}
@@ -0,0 +1,144 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+CUSTOMER_CONFIG = {
+    'customerId': 'c1',
+    'AMC': {
+        'amcApiEndpoint': 'https://amc.example.com/prod',
+        'WFM': {'amcWorkflowExecutionSQSQueueName': 'c1-queue'}
+    }
+}
+
+
+@pytest.fixture(scope='module')
+def consumer(load_wfm_handler):
+    return load_wfm_handler('workflow_queue_consumer')
+
+
+class FakeQueue:
+    """SQS queue whose received messages stay invisible, like until their visibility timeout"""
+
+    url = 'https://sqs.example.com/c1-queue'
+
+    def __init__(self, size):
+        self.visible = [SimpleNamespace(
+            message_id='m{}'.format(index),
+            receipt_handle='r{}'.format(index),
+            message_attributes={'customerId': {'StringValue': 'c1'},
+                                'workflowId': {'StringValue': 'w{}'.format(index)}},
+            body=json.dumps({'payload': {'workflowId': 'w{}'.format(index)}})
+        ) for index in range(size)]
+        self.receive_sizes = []
+        self.deleted = []
+
+    def receive_messages(self, MessageAttributeNames, MaxNumberOfMessages):
+        assert MaxNumberOfMessages <= 10
+        messages, self.visible = self.visible[:MaxNumberOfMessages], self.visible[MaxNumberOfMessages:]
+        self.receive_sizes.append(len(messages))
+        return messages
+
+    def delete_messages(self, Entries):
+        self.deleted += [entry['ReceiptHandle'] for entry in Entries]
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries]}
+
+
+class FakeContext:
+    def __init__(self, remaining_times_ms):
+        self.remaining_times_ms = list(remaining_times_ms)
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_times_ms.pop(0) if len(self.remaining_times_ms) > 1 else self.remaining_times_ms[0]
+
+
+@pytest.fixture
+def drain(consumer, monkeypatch):
+    def setup(queue_size, executions_available, status_code=200):
+        queue = FakeQueue(queue_size)
+        submissions = []
+
+        def submit_workflow_executions(customer_config, run_workflow_requests, max_concurrent_submissions):
+            submissions.append(len(run_workflow_requests))
+            return [{'statusCode': status_code, 'message': '',
+                     'body': {'workflowExecutionId': 'e-{}'.format(request['workflowId'])}}
+                    for request in run_workflow_requests]
+
+        monkeypatch.setattr(consumer, 'get_number_of_executions_available', lambda customer_config: {
+            'executionsAvailable': executions_available, 'executionsRunning': 0, 'executionsPending': 0})
+        monkeypatch.setattr(consumer.boto3, 'resource', lambda service_name: SimpleNamespace(
+            get_queue_by_name=lambda QueueName: queue))
+        monkeypatch.setattr(consumer, 'submit_workflow_executions', submit_workflow_executions)
+        monkeypatch.setattr(consumer, 'updateExeuctionTrackingTable', lambda customer_config, executions: None)
+        return queue, submissions
+
+    return setup
+
+
+class TestProcessQueue:
+
+    @staticmethod
+    def test_drains_up_to_the_executions_available(consumer, drain):
+        queue, submissions = drain(queue_size=40, executions_available=25)
+
+        result = consumer.process_queue(CUSTOMER_CONFIG)
+
+        assert queue.receive_sizes == [10, 10, 5]
+        assert submissions == [10, 10, 5]
+        assert result['messagesReceived'] == 25
+        assert result['messagesDeleted'] == 25
+        assert len(queue.visible) == 15
+
+    @staticmethod
+    def test_stops_when_the_queue_is_empty(consumer, drain):
+        queue, submissions = drain(queue_size=12, executions_available=25)
+
+        result = consumer.process_queue(CUSTOMER_CONFIG)
+
+        assert queue.receive_sizes == [10, 2, 0]
+        assert result['messagesDeleted'] == 12
+
+    @staticmethod
+    def test_nothing_is_received_without_executions_available(consumer, drain):
+        queue, submissions = drain(queue_size=12, executions_available=0)
+
+        result = consumer.process_queue(CUSTOMER_CONFIG)
+
+        assert queue.receive_sizes == []
+        assert result['messagesReceived'] == 0
+
+    @staticmethod
+    def test_failed_submissions_use_the_executions_available(consumer, drain):
+        queue, submissions = drain(queue_size=40, executions_available=15, status_code=429)
+
+        result = consumer.process_queue(CUSTOMER_CONFIG)
+
+        assert queue.receive_sizes == [10, 5]
+        assert result['messagesDeleted'] == 0
+        assert result['statusCode'] == 429
+
+    @staticmethod
+    def test_stops_before_the_function_times_out(consumer, drain):
+        queue, submissions = drain(queue_size=40, executions_available=40)
+        min_remaining_time_ms = consumer.QUEUE_DRAIN_MIN_REMAINING_TIME_MS
+        context = FakeContext([min_remaining_time_ms + 1000, min_remaining_time_ms - 1000])
+
+        result = consumer.process_queue(CUSTOMER_CONFIG, context)
+
+        assert queue.receive_sizes == [10]
+        assert result['messagesDeleted'] == 10
+        assert any('about to time out' in message for message in result['messages'])
@@ -0,0 +1,115 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+CUSTOMER_CONFIG = {
+    'customerId': 'c1',
+    'AMC': {
+        'amcApiEndpoint': 'https://amc.example.com/prod',
+        'amcInstanceRegion': 'us-east-1',
+        'WFM': {'snsTopicArn': 'arn:aws:sns:us-east-1:123456789012:wfm'}
+    }
+}
+
+
+@pytest.fixture(scope='module')
+def consumer(load_wfm_handler):
+    return load_wfm_handler('workflow_queue_consumer')
+
+
+class FakeAmcApiClient:
+    """AMC API answering the later workflows first, failing the workflowIds it is given"""
+
+    def __init__(self, failing_workflow_ids=()):
+        self.failing_workflow_ids = set(failing_workflow_ids)
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def request(self, request_method, request_url, region, request_body=''):
+        workflow_id = json.loads(request_body)['workflowId']
+        with self._lock:
+            self.threads.add(threading.get_ident())
+        time.sleep(0.05 / (1 + int(workflow_id[1:])))
+        status = 400 if workflow_id in self.failing_workflow_ids else 200
+        return SimpleNamespace(status=status,
+                               data=json.dumps({'workflowExecutionId': 'e-{}'.format(workflow_id)}).encode())
+
+
+def run_workflow_requests(size):
+    return [{'payload': {'workflowId': 'w{}'.format(index), 'timeWindowStart': '2022-01-01T00:00:00',
+                         'timeWindowEnd': '2022-01-02T00:00:00'}} for index in range(size)]
+
+
+@pytest.fixture
+def submission(consumer, monkeypatch):
+    def setup(mode, failing_workflow_ids=()):
+        amc_api_client = FakeAmcApiClient(failing_workflow_ids)
+        published = []
+
+        monkeypatch.setattr(consumer, 'WORKFLOW_SUBMISSION_MODE', mode)
+        monkeypatch.setattr(consumer, 'get_amc_api_client', lambda: amc_api_client)
+        monkeypatch.setattr(consumer.wfmutils, 'sns_publish_message',
+                            lambda topic_arn, subject, message: published.append(message['body']))
+        return amc_api_client, published
+
+    return setup
+
+
+class TestSubmitWorkflowExecutions:
+
+    @staticmethod
+    def test_concurrent_responses_keep_the_request_order(consumer, submission):
+        amc_api_client, published = submission('concurrent')
+
+        responses = consumer.submit_workflow_executions(CUSTOMER_CONFIG, run_workflow_requests(5), 5)
+
+        assert [response['body']['workflowExecutionId'] for response in responses] == [
+            'e-w0', 'e-w1', 'e-w2', 'e-w3', 'e-w4']
+        assert len(amc_api_client.threads) > 1
+        assert published == []
+
+    @staticmethod
+    def test_concurrent_failures_are_published_once(consumer, submission):
+        amc_api_client, published = submission('concurrent', failing_workflow_ids=['w1', 'w3'])
+
+        responses = consumer.submit_workflow_executions(CUSTOMER_CONFIG, run_workflow_requests(5), 5)
+
+        assert [response['statusCode'] for response in responses] == [200, 400, 200, 400, 200]
+        assert published == [{'workflowExecutionId': 'e-w1'}, {'workflowExecutionId': 'e-w3'}]
+
+    @staticmethod
+    def test_sequential_by_default(consumer, submission):
+        amc_api_client, published = submission('sequential', failing_workflow_ids=['w1'])
+
+        responses = consumer.submit_workflow_executions(CUSTOMER_CONFIG, run_workflow_requests(3), 5)
+
+        assert [response['statusCode'] for response in responses] == [200, 400, 200]
+        assert amc_api_client.threads == {threading.get_ident()}
+        assert published == [{'workflowExecutionId': 'e-w1'}]
+
+    @staticmethod
+    def test_concurrent_with_a_single_submission_allowed_is_sequential(consumer, submission):
+        amc_api_client, published = submission('concurrent', failing_workflow_ids=['w0'])
+
+        responses = consumer.submit_workflow_executions(CUSTOMER_CONFIG, run_workflow_requests(3), 1)
+
+        assert len(responses) == 3
+        assert amc_api_client.threads == {threading.get_ident()}
+        assert published == [{'workflowExecutionId': 'e-w0'}]
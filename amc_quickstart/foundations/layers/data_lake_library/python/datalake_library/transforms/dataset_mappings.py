@@ -50,6 +50,8 @@ def main():
                 UpdateExpression='SET #T = :t',
                 ConditionExpression='attribute_exists(#N)'
             )
+            # running Lambda containers keep the transforms they resolved for up to TRANSFORM_CACHE_TTL_SECONDS
+            # (see TransformHandler), the new mapping is only picked up once that TTL expires
             print("Dataset {} transforms successfully updated".format(dataset_name))
         except ClientError as e:
             if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
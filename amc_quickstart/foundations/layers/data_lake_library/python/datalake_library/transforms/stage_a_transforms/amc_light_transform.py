@@ -25,35 +25,126 @@
 
 
 import json
-import pandas as pd
-import awswrangler as wr
-import re
-import pandas as pd
-import numpy as np
-import boto3
 from boto3.dynamodb.conditions import Key, Attr
 import io
 import os
+import time
 
 #######################################################
 # Use S3 Interface to interact with S3 objects
 # For example to download/upload them
 #######################################################
-from datalake_library.commons import init_logger
+from datalake_library.amc_result_key import AmcResultKey
+from datalake_library.clients import get_client, get_resource
+from datalake_library.commons import init_logger, sanitize_table_name
 from datalake_library.configuration.resource_configs import S3Configuration, KMSConfiguration
 from datalake_library.interfaces.s3_interface import S3Interface
 
-s3 = boto3.resource('s3')
-dynamodb = boto3.resource("dynamodb")
-ssm=boto3.client('ssm')
+s3 = get_resource('s3')
+dynamodb = get_resource("dynamodb")
+ssm = get_client('ssm')
 
 s3_interface = S3Interface()
-# IMPORTANT: Stage bucket where transformed data must be uploaded
-stage_bucket = S3Configuration().stage_bucket
+# IMPORTANT: Stage bucket where transformed data must be uploaded, read from SSM on first use (see get_stage_bucket)
+stage_bucket = None
+
+# copy: the source file is copied server side with its metadata, the heavy transform replaces the escaped quotes
+# rewrite: the source file is downloaded and uploaded with its escaped quotes replaced
+LIGHT_TRANSFORM_MODE = os.getenv('LIGHT_TRANSFORM_MODE', 'rewrite').lower()
+
+# size of the chunks the source file is read and rewritten in
+READ_CHUNK_SIZE = 1024 * 1024
+
+# seconds the customer config table name and the customer config of a bucket are reused by a warm container
+CUSTOMER_CONFIG_TTL_SECONDS = int(os.getenv('CUSTOMER_CONFIG_TTL_SECONDS', '300'))
+
+# customer config table name (from SSM) and bucket -> (prefix, customer_hash_key, oob_reports), with their expiry time
+customer_config_table_cache = {}
+bucket_config_cache = {}
 
 logger = init_logger(__name__)
 
 
+def get_stage_bucket():
+    global stage_bucket
+    if stage_bucket is None:
+        stage_bucket = S3Configuration().stage_bucket
+    return stage_bucket
+
+
+def get_customer_config_table(refresh=False):
+    cached = customer_config_table_cache.get('table')
+    if not refresh and cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    customer_config = ssm.get_parameter(
+        Name='/AMC/DynamoDB/DataLake/CustomerConfig',
+        WithDecryption=True
+    ).get('Parameter').get('Value')
+    customer_config_table_cache['table'] = (time.monotonic() + CUSTOMER_CONFIG_TTL_SECONDS, customer_config)
+    return customer_config
+
+
+def query_bucket_config(customer_config, bucket):
+    config_table = dynamodb.Table(customer_config)
+    response = config_table.query(
+        IndexName='amc-index',
+        Select='ALL_PROJECTED_ATTRIBUTES',
+        KeyConditionExpression=Key('hash_key').eq(bucket)
+    )
+    return response['Items']
+
+
+def get_bucket_config(bucket):
+    """Returns the customer config of an AMC bucket, cached for CUSTOMER_CONFIG_TTL_SECONDS
+
+    Arguments:
+        bucket {string} -- AMC bucket the result files are delivered to
+
+    Returns:
+        tuple -- Table prefix, customer hash key and out of the box report workflow names of the customer
+    """
+    cached = bucket_config_cache.get(bucket)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    try:
+        items = query_bucket_config(get_customer_config_table(), bucket)
+    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+        items = []
+    if not items:
+        # the customer config table may have been replaced since its name was cached, read it again before failing
+        items = query_bucket_config(get_customer_config_table(refresh=True), bucket)
+    item = items[0]
+    bucket_config = (item['prefix'].lower(), item['customer_hash_key'].lower(), list(item.get('oob_reports', [])))
+    bucket_config_cache[bucket] = (time.monotonic() + CUSTOMER_CONFIG_TTL_SECONDS, bucket_config)
+    return bucket_config
+
+
+def rewrite_escaped_quotes(chunks):
+    """Replaces the escaped double quotes (\\") of a stream of byte chunks with single quotes
+
+    A trailing backslash is held back until the next chunk so a \\" split across two
+    chunks is still replaced
+
+    Arguments:
+        chunks {iterable} -- Byte chunks of the file
+
+    Returns:
+        generator -- Rewritten byte chunks
+    """
+    held_back = b''
+    for chunk in chunks:
+        data = held_back + chunk
+        if data.endswith(b'\\'):
+            data, held_back = data[:-1], b'\\'
+        else:
+            held_back = b''
+        yield data.replace(b'\\"', b"'")
+    if held_back:
+        yield held_back
+
+
 class CustomTransform():
     def __init__(self):
         logger.info("S3 Blueprint Light Transform initiated")
@@ -63,65 +154,55 @@ class CustomTransform():
         #show the object key received
         logger.info('SOURCE OBJECT KEY: ' + key)
 
-        #retreive the source file as an S3 object
-        s3Object = s3.Object(bucket, key)
+        #break the file key into it's name compoments, before any request is made for the object
+        resultKey = AmcResultKey.parse(key) # USE WHEN INGESTION BUCKET OUTSIDE OF LAKE
+
+        if resultKey is None or not resultKey.is_csv:
+            logger.info("Key {} is not an AMC csv result, skipping transformation".format(key))
+            return []
+
+        #see if the workflow name matches the naming scheme for a AMC UI result:
+        if resultKey.is_amc_ui_result:
+            logger.info("Workflow name {} appears to be a result from the AMC UI, skipping transformation, setting processed_keys to an empty array".format(resultKey.workflow_name))
+            return []
+
+        if LIGHT_TRANSFORM_MODE == 'copy':
+            #the content is not downloaded, a HEAD is enough to get the size and last modified date
+            s3Object = s3.meta.client.head_object(Bucket=bucket, Key=key)
+            return self._transform_object(bucket, key, team, dataset, s3Object, resultKey)
+
+        #retreive the source file with a single GET, the response carries the size and last modified date with the body
+        s3Object = s3.Object(bucket, key).get()
+        try:
+            return self._transform_object(bucket, key, team, dataset, s3Object, resultKey)
+        finally:
+            #the body is not read when the file is skipped, release the connection either way
+            s3Object['Body'].close()
+
+    def _transform_object(self, bucket, key, team, dataset, s3Object, resultKey):
 
         #get the file size - originally we would send the file size to the email lambda to determine if it can be attached
-        fileSize=s3Object.content_length
+        fileSize = s3Object['ContentLength']
 
         #get the file last modified date as a formatted string        
-        fileLastModified = s3_interface.get_last_modified(bucket, key)
+        fileLastModified = s3Object['LastModified'].isoformat()
         fileLastModified = fileLastModified.replace(' ', '-').replace(':', '-').split('+')[0]
         print('fileLastModified: {}'.format(fileLastModified))
 
-        #initialize our variables extracted from the key:
-        keyTeam = keyDataset = workflowName = scheduleFrequency = fileName = fileYear = fileMonth = fileDay = fileHour = fileMinute = fileSecond = fileMillisecond = fileBasename = fileExtension = fileVersion = ''
+        # keyTeam,keyDataset = team,dataset # the team and dataset are not part of the key when ingesting direct from amc bucket
+        keyTeam = team
+        keyDataset = dataset
+        workflowName = resultKey.workflow_name
+        scheduleFrequency = resultKey.schedule_frequency
+        fileName = resultKey.file_name
+        fileYear, fileMonth, fileDay = resultKey.file_year, resultKey.file_month, resultKey.file_day
+        fileHour, fileMinute, fileSecond = resultKey.file_hour, resultKey.file_minute, resultKey.file_second
+        fileMillisecond = resultKey.file_millisecond
+        fileBasename, fileExtension, fileVersion = resultKey.file_basename, resultKey.file_extension, resultKey.file_version
 
         processed_keys = []
 
-        #break the file key into it's name compoments
-        keyParts = re.match("workflow=([^/]*)/schedule=([^/]*)/(.*)", key) # USE WHEN INGESTION BUCKET OUTSIDE OF LAKE
-
-        if keyParts is not None :
-            # keyTeam,keyDataset,workflowName, scheduleFrequency, fileName = keyParts.groups() # use 1 line if ingesting from raw bucket
-            workflowName, scheduleFrequency, fileName = keyParts.groups() # use below 3 lines if ingesting direct from amc bucket
-            keyTeam = team
-            keyDataset = dataset
-
-            #see if the workflow name matches the naming scheme for a AMC UI result:
-            if re.match("analytics-[0-9a-fA-F]{8}-([0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}", workflowName) is not None:
-                logger.info("Workflow name {} appears to be a result from the AMC UI, skipping transformation, setting processed_keys to an empty array".format(workflowName))
-                processed_keys = []
-                return(processed_keys)
-
-            #see if the key matches the file name patern with time e.g. workflow=standard_geo_date_summary_V3/schedule=adhoc/file_last_modified=2020-02-03-12-25-38/2020-02-03T14:01:47Z-standard_geo_date_summary.csv
-        fileNameWithTimeSearchResults = re.match("([0-9]{4})-([0-9]{2})-([0-9]{2})T([0-9]{2}):([0-9]{2}):([0-9]{2})\.([0-9]{3})Z-([^\.]*)\.(.*)",fileName)
-
-        if fileNameWithTimeSearchResults is not None:
-            fileYear, fileMonth, fileDay, fileHour, fileMinute, fileSecond,fileMillisecond, fileBasename,fileExtension = fileNameWithTimeSearchResults.groups()
-        else:
-            #Check to see if the key matches the patern with date only e.g. workflow=standard_geo_date_summary_V3/schedule=weekly/2020-02-04-standard_geo_date_summary_V3-ver2.csv
-            fileNameDateOnlySearchResults = re.match("([0-9]{4})-([0-9]{2})-([0-9]{2})-([^.]*)\.(.*)",fileName)
-            if fileNameDateOnlySearchResults is not None:
-                fileYear, fileMonth, fileDay, fileBasename ,fileExtension = fileNameDateOnlySearchResults.groups()
-        
-        #check to see if we have a version appended to the end fo the file basename
-        versionResults = re.match(".*-(ver[0-9])",fileBasename)
-        if versionResults is not None :
-            fileVersion = versionResults.groups()[0]
-
-        customer_config = ssm.get_parameter(
-            Name='/AMC/DynamoDB/DataLake/CustomerConfig',
-            WithDecryption=True
-        ).get('Parameter').get('Value')
-        config_table = dynamodb.Table(customer_config)
-        response = config_table.query(
-            IndexName='amc-index',
-            Select='ALL_PROJECTED_ATTRIBUTES',
-            KeyConditionExpression=Key('hash_key').eq(bucket)
-        )
-        prefix = response['Items'][0]['prefix'].lower()
-        customer_hash_key = response['Items'][0]['customer_hash_key'].lower()
+        prefix, customer_hash_key, oob_reports = get_bucket_config(bucket)
         print('prefix: {}'.format(prefix))
         ##################################
 
@@ -130,22 +211,23 @@ class CustomTransform():
         print ("workflowName : " + workflowName)
         print ("scheduleFrequency : " + scheduleFrequency)
         
-        if fileExtension.lower() == 'csv' and workflowName != '' and scheduleFrequency != '' :
+        if resultKey.is_csv:
+
+            fileContent = None
 
             ### Validate small file ###
             if fileSize < 1000:
                 print ("File Size small")
-                line_count = s3Object.get()['Body'].read().decode('utf-8').count('\n')
+                #keep the downloaded bytes, they are the content uploaded below
+                if 'Body' in s3Object:
+                    fileContent = s3Object['Body'].read()
+                else:
+                    fileContent = s3.Object(bucket, key).get()['Body'].read()
+                line_count = fileContent.count(b'\n')
                 if line_count <= 1:
                     print ("Count small")
                     return processed_keys
 
-            oob_reports = []
-
-            if 'oob_reports' in response['Items'][0]:
-                for wf in response['Items'][0]['oob_reports']:
-                    oob_reports.append(wf)
-
             #Calculate the output path with paritioning based on the original file name
             output_path = ''
 
@@ -164,7 +246,7 @@ class CustomTransform():
             print ("output Path : " + output_path)
 
             output_path = os.path.splitext(output_path)[0].rsplit('/', 1)[0].split('/')
-            output_path[0] = wr.catalog.sanitize_table_name(output_path[0])
+            output_path[0] = sanitize_table_name(output_path[0])
             output_path = '/'.join(output_path)
             output_path = '{}/{}.{}'.format(output_path,fileBasename,fileExtension)
 
@@ -173,11 +255,10 @@ class CustomTransform():
             s3_path = 'pre-stage/{}/{}/{}'.format(team,dataset, output_path)
             print('S3 Path: {}'.format(s3_path))
 
+            stage_bucket = get_stage_bucket()
             s3OutputPath = 's3://{}/{}'.format(stage_bucket,s3_path)
 
             kms_key = KMSConfiguration("Stage").get_kms_arn
-            
-            content = s3Object.get()['Body'].read().decode("UTF8").replace('\\"',"'")
 
             fileMetaData = {
             'keyTeam' : keyTeam,
@@ -198,9 +279,17 @@ class CustomTransform():
             'partitionedPath': output_path.rsplit('/', 1)[0]
             }
 
-            s3.Object(stage_bucket, s3_path).put(Body=content, ServerSideEncryption='aws:kms',SSEKMSKeyId=kms_key,
-            Metadata=fileMetaData
-            )
+            if LIGHT_TRANSFORM_MODE == 'copy':
+                #the content is unchanged, copy it server side (in parts for large files) replacing its metadata
+                s3_interface.copy_object(bucket, key, stage_bucket, s3_path, kms_key, metadata=fileMetaData)
+            else:
+                #rewrite the file chunk by chunk into a multipart upload so memory use does not grow with the file size
+                if fileContent is not None:
+                    chunks = [fileContent]
+                else:
+                    chunks = s3Object['Body'].iter_chunks(READ_CHUNK_SIZE)
+                s3_interface.write_object_parts(stage_bucket, s3_path, rewrite_escaped_quotes(chunks), kms_key,
+                                                metadata=fileMetaData)
 
             # IMPORTANT S3 path(s) must be stored in a list
             processed_keys = [s3_path]
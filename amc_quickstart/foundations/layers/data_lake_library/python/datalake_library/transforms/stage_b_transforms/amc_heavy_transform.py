@@ -29,13 +29,11 @@
 #######################################################
 import json
 import datetime as dt
-
-import boto3
 import sys
 
-import awswrangler as wr
-
-from datalake_library.commons import init_logger
+from datalake_library.amc_result_key import split_stage_key
+from datalake_library.clients import get_client
+from datalake_library.commons import init_logger, sanitize_table_name
 from datalake_library.configuration.resource_configs import S3Configuration, KMSConfiguration
 from datalake_library.interfaces.s3_interface import S3Interface
 
@@ -43,7 +41,7 @@ from datalake_library.interfaces.s3_interface import S3Interface
 logger = init_logger(__name__)
 
 # Create a client for the AWS Analytical service to use
-client = boto3.client('glue')
+client = get_client('glue')
 
 
 def datetimeconverter(o):
@@ -57,7 +55,7 @@ class CustomTransform():
 
     def transform_object(self, bucket, keys, team, dataset):
         
-        ssm=boto3.client('ssm')
+        ssm = get_client('ssm')
 
         silver_catalog = ssm.get_parameter(
             Name='/AMC/Glue/{}/{}/StageDataCatalog'.format(team, dataset),
@@ -95,15 +93,14 @@ class CustomTransform():
         for key in keys:
             keycounter+=1 
             logger.info("key {}: {}".format(keycounter, key))
-            tablePath = '/'.join(key.split('/')[:4])
+            tablePath, table_partitions = split_stage_key(key)
             logger.info("tablePath:{}".format(tablePath))
             tableS3Location = 's3://{}/{}/{}'.format(bucket, 'post-stage', tablePath.split('/', 1)[1])
             logger.info('tableS3Location:{}'.format(tableS3Location))
             s3LocationsToAdd[tableS3Location]=True
-            table_partitions = '/'.join(key.split('/')[4:-1])
             logger.info('table_partitions:{}'.format(table_partitions))
 
-            sanitized_table_name = wr.catalog.sanitize_table_name(tablePath.rsplit('/')[-1])
+            sanitized_table_name = sanitize_table_name(tablePath.rsplit('/')[-1])
             if sanitized_table_name not in tables:
                 tables.append(
                     "{}/{}".format(sanitized_table_name, table_partitions)
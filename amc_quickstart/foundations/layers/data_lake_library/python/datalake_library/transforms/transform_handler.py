@@ -12,33 +12,60 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import threading
+import time
 from importlib import import_module
 
 from datalake_library.commons import init_logger
 from datalake_library.configuration.resource_configs import DynamoConfiguration
 from datalake_library.interfaces.dynamo_interface import DynamoInterface
 
+TRANSFORM_CACHE_TTL_SECONDS = int(os.getenv('TRANSFORM_CACHE_TTL_SECONDS', '300'))
+
+# (team, dataset, stage suffix) -> (expiry time, CustomTransform class), shared by the handler invocations
+# of a Lambda container so the Datasets table is not read for every object. There is no invalidation signal,
+# a transform updated in the Datasets table is picked up once its entry expires
+transform_cache = {}
+transform_cache_lock = threading.Lock()
+dynamo_interface = None
+
 logger = init_logger(__name__)
 
 
+def get_dynamo_interface():
+    global dynamo_interface
+    if dynamo_interface is None:
+        dynamo_interface = DynamoInterface(DynamoConfiguration())
+    return dynamo_interface
+
+
 class TransformHandler:
     def __init__(self):
         logger.info("Transformation Handler initiated")
 
-    def stage_transform(self, team, dataset, stage):
-        """Returns relevant stage Transformation
+    def stage_transform(self, team, dataset, stage, refresh=False):
+        """Returns relevant stage Transformation, cached for TRANSFORM_CACHE_TTL_SECONDS
 
         Arguments: 
             team {string} -- Team owning the transformation 
             dataset {string} -- Dataset targeted by transformation 
+            stage {string} -- Stage of the pipeline (e.g. StageA)
+            refresh {bool} -- Reads the transform from the Datasets table even if it is cached
         Returns: 
             class -- Transform object 
         """
         stage_suffix = stage[-1].lower()
-        dynamo_config = DynamoConfiguration()
-        dynamo_interface = DynamoInterface(dynamo_config)
-        dataset_transforms = dynamo_interface.get_transform_table_item(
+        cache_key = (team, dataset, stage_suffix)
+        cached = transform_cache.get(cache_key)
+        if not refresh and cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        dataset_transforms = get_dynamo_interface().get_transform_table_item(
             '{}-{}'.format(team, dataset))['transforms']['stage_{}_transform'.format(stage_suffix)]
         transform_info = "datalake_library.transforms.stage_{}_transforms.{}".format(
             stage_suffix, dataset_transforms)
-        return getattr(import_module(transform_info), 'CustomTransform')
+        transform = getattr(import_module(transform_info), 'CustomTransform')
+        with transform_cache_lock:
+            transform_cache[cache_key] = (time.monotonic() + TRANSFORM_CACHE_TTL_SECONDS, transform)
+        return transform
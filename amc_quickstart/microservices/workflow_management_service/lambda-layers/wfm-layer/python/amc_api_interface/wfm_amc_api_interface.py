@@ -19,12 +19,9 @@ import json
 import calendar
 from dateutil.relativedelta import relativedelta
 import logging
-from boto3 import Session
-import urllib3
 from urllib.parse import urlencode
-from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
 from datetime import datetime, timedelta
+from wfm.amc_api_client import get_amc_api_client
 
 # This class will create HTTP Request for the AMC API Endpoint
 class AMCAPIInterface:
@@ -108,12 +105,13 @@ class AMCAPIInterface:
 
     # Gets the sigV4 signed header value based on the customers endpointurl, request type, and body
     def get_signed_headers(self, request_method, request_endpoint_url, request_body):
-        config = self.config
-        # Generate signed http headers for Sigv4
-        AWS_REGION = config['AMC']['amcInstanceRegion']
-        request = AWSRequest(method=request_method.upper(), url=request_endpoint_url, data=request_body)
-        SigV4Auth(Session().get_credentials(), "execute-api", AWS_REGION).add_auth(request)
-        return dict(request.headers.items())
+        return get_amc_api_client().get_signed_headers(request_method, request_endpoint_url,
+                                                       self.config['AMC']['amcInstanceRegion'], request_body)
+
+    # Sends a signed request to the customers AMC endpoint over the pooled connections of the Lambda container
+    def send_request(self, request_method, request_endpoint_url, request_body):
+        return get_amc_api_client().request(request_method, request_endpoint_url,
+                                            self.config['AMC']['amcInstanceRegion'], request_body)
 
     # returns all workflows for the AMC endpoint
     def get_workflows(self):
@@ -126,10 +124,7 @@ class AMCAPIInterface:
         request_body = ''
         receivedWorkFlows = False
         workflowIdList = []
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
 
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
         if AMC_API_RESPONSE.status == 200:
@@ -171,10 +166,7 @@ class AMCAPIInterface:
 
         url = "{}/workflowExecutions/?workflowId={}".format(config['AMC']['amcApiEndpoint'], workflowId)
 
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
         if (AMC_API_RESPONSE.status == 200):
@@ -207,10 +199,7 @@ class AMCAPIInterface:
         request_method = 'GET'
         request_body = ''
         url = "{}/workflowExecutions/{}".format(config['AMC']['amcApiEndpoint'], workflowExecutionId)
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
         if (AMC_API_RESPONSE.status == 200):
@@ -253,10 +242,7 @@ class AMCAPIInterface:
             receivedExecutionStatus = False
             url = "{}/workflowExecutions/?{}".format(config['AMC']['amcApiEndpoint'], urlencode(
                 {'minCreationTime': minCreationTime, "nextToken": AMC_API_RESPONSE_DICTIONARY['nextToken']}))
-            AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                             headers=self.get_signed_headers(request_method, url,
-                                                                                             request_body),
-                                                             body=request_body)
+            AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
             AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
             statuses[url] = AMC_API_RESPONSE.status
 
@@ -291,10 +277,7 @@ class AMCAPIInterface:
         message = ''
         request_method = 'POST'
         request_body = json.dumps(payload)
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
         if (AMC_API_RESPONSE.status == 200):
@@ -338,10 +321,7 @@ class AMCAPIInterface:
         url = "{}/workflows/{}".format(config['AMC']['amcApiEndpoint'], payload['workflowId'])
         request_method = 'PUT'
         request_body = json.dumps(payload)
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
         if (AMC_API_RESPONSE.status == 200):
@@ -376,10 +356,7 @@ class AMCAPIInterface:
         url = "{}/workflows/{}".format(config['AMC']['amcApiEndpoint'], payload['workflowId'])
         request_method = 'DELETE'
         request_body = json.dumps(payload)
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
         logger.info('Workflow delete response {}'.format(AMC_API_RESPONSE))
@@ -416,10 +393,7 @@ class AMCAPIInterface:
         request_method = 'GET'
         request_body = ''
         logger.info('get workflow request URL: {}'.format(url))
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
         logger.info('response data: {}'.format(AMC_API_RESPONSE.data))
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
         logger.info('get workflow response {}'.format(AMC_API_RESPONSE))
@@ -464,10 +438,7 @@ class AMCAPIInterface:
         url = "{}/workflowExecutions".format(config['AMC']['amcApiEndpoint'])
         request_method = 'POST'
         request_body = json.dumps(payload)
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
         if (AMC_API_RESPONSE.status == 200):
@@ -500,10 +471,7 @@ class AMCAPIInterface:
 
         request_method = 'DELETE'
         request_body = json.dumps(payload)
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
         logger.info(
@@ -542,10 +510,7 @@ class AMCAPIInterface:
         request_method = 'GET'
         request_body = ''
         logger.info('get workflow request URL: {}'.format(url))
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=self.get_signed_headers(request_method, url,
-                                                                                         request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
         logger.info('response data: {}'.format(AMC_API_RESPONSE.data))
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
@@ -587,11 +552,7 @@ class AMCAPIInterface:
             url = "{}/schedules/{}".format(config['AMC']['amcApiEndpoint'], schedule_id)
             request_method = 'DELETE'
             request_body = json.dumps(payload)
-            AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                             headers=self.get_signed_headers(config, request_method,
-                                                                                             url,
-                                                                                             request_body),
-                                                             body=request_body)
+            AMC_API_RESPONSE = self.send_request(request_method, url, request_body)
             AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
             logger.info('schedule delete response {}'.format(AMC_API_RESPONSE))
@@ -0,0 +1,117 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+
+import urllib3
+from boto3 import Session
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+
+# connections kept open per AMC endpoint, raise it when the API is called from several threads
+AMC_API_MAX_CONNECTIONS = int(os.environ.get('AMC_API_MAX_CONNECTIONS', '10'))
+AMC_API_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('AMC_API_CONNECT_TIMEOUT_SECONDS', '10'))
+AMC_API_READ_TIMEOUT_SECONDS = float(os.environ.get('AMC_API_READ_TIMEOUT_SECONDS', '60'))
+
+
+class AmcApiClient:
+    def __init__(self, service_name='execute-api', max_connections=AMC_API_MAX_CONNECTIONS):
+        """SigV4 signed HTTP client of the AMC API, meant to be shared by the invocations of a Lambda container
+
+        The keep-alive connections of each endpoint are pooled, the credentials are resolved once and the
+        signer of a region is reused until the credentials are rotated.
+
+        Arguments:
+            service_name {string} -- Name of the service the requests are signed for
+            max_connections {int} -- Connections kept open per endpoint
+        """
+        self.service_name = service_name
+        self.pool_manager = urllib3.PoolManager(
+            maxsize=max_connections,
+            timeout=urllib3.Timeout(connect=AMC_API_CONNECT_TIMEOUT_SECONDS, read=AMC_API_READ_TIMEOUT_SECONDS))
+        self._credentials = None
+        self._signers = {}
+        self._lock = threading.Lock()
+
+    def get_signer(self, region):
+        """Returns the SigV4 signer of a region, rebuilt when the credentials have been refreshed
+
+        Arguments:
+            region {string} -- Region of the AMC instance
+
+        Returns:
+            botocore.auth.SigV4Auth -- Signer of the region
+        """
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = Session().get_credentials()
+            # refreshable credentials (e.g. assumed roles) are refreshed by botocore before they expire
+            credentials = self._credentials.get_frozen_credentials()
+            signer = self._signers.get(region)
+            if signer is None or signer.credentials != credentials:
+                signer = SigV4Auth(credentials, self.service_name, region)
+                self._signers[region] = signer
+            return signer
+
+    def get_signed_headers(self, request_method, request_url, region, request_body):
+        """Returns the SigV4 signed headers of a request
+
+        Arguments:
+            request_method {string} -- HTTP method (GET, POST, PUT, DELETE)
+            request_url {string} -- URL of the request
+            region {string} -- Region of the AMC instance
+            request_body {string} -- Body of the request
+
+        Returns:
+            dict -- Headers of the request
+        """
+        request = AWSRequest(method=request_method.upper(), url=request_url, data=request_body)
+        self.get_signer(region).add_auth(request)
+        return dict(request.headers.items())
+
+    def request(self, request_method, request_url, region, request_body=''):
+        """Sends a signed request to the AMC API over a pooled connection
+
+        Arguments:
+            request_method {string} -- HTTP method (GET, POST, PUT, DELETE)
+            request_url {string} -- URL of the request
+            region {string} -- Region of the AMC instance
+            request_body {string} -- Body of the request
+
+        Returns:
+            urllib3.response.HTTPResponse -- Response of the AMC API, with its data already read
+        """
+        return self.pool_manager.request(request_method, request_url,
+                                         headers=self.get_signed_headers(request_method, request_url, region,
+                                                                         request_body),
+                                         body=request_body)
+
+
+_amc_api_client = None
+_amc_api_client_lock = threading.Lock()
+
+
+def get_amc_api_client():
+    """Returns the AMC API client of the Lambda container, built on first use
+
+    Returns:
+        AmcApiClient -- Shared AMC API client
+    """
+    global _amc_api_client
+    if _amc_api_client is None:
+        with _amc_api_client_lock:
+            if _amc_api_client is None:
+                _amc_api_client = AmcApiClient()
+    return _amc_api_client
@@ -20,11 +20,7 @@
 
 import boto3
 import json
-from boto3 import Session
 import os
-import urllib3
-from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
 from datetime import datetime, timedelta, timezone
 from dateutil.parser import parse
 from dateutil.tz import gettz
@@ -32,6 +28,7 @@ from dateutil.relativedelta import relativedelta
 import calendar
 from aws_lambda_powertools import Logger
 from wfm import wfm_utils
+from wfm.amc_api_client import get_amc_api_client
 
 logger = Logger(service="WorkFlowManagement", level="INFO")
 wfmutils = wfm_utils.Utils(logger)
@@ -145,12 +142,10 @@ def getExecutionsByStatus(config, executionStatusFilterValue="RUNNING"):
     return (workflowExecutions)
 
 
-def getSignedHeaders(config, request_method, request_endpoint_url, request_body):
-    # Generate signed http headers for Sigv4
-    AWS_REGION = config['AMC']['amcInstanceRegion']
-    request = AWSRequest(method=request_method.upper(), url=request_endpoint_url, data=request_body)
-    SigV4Auth(Session().get_credentials(), "execute-api", AWS_REGION).add_auth(request)
-    return dict(request.headers.items())
+def sendRequest(config, request_method, request_endpoint_url, request_body):
+    # Sends a signed request over the pooled connections of the Lambda container
+    return get_amc_api_client().request(request_method, request_endpoint_url, config['AMC']['amcInstanceRegion'],
+                                        request_body)
 
 def executeWorkflow(config, event):
     payload = event['payload']
@@ -172,9 +167,7 @@ def executeWorkflow(config, event):
     url = "{}/workflowExecutions".format(config['AMC']['amcApiEndpoint'])
     request_method = 'POST'
     request_body = json.dumps(payload)
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
     if (AMC_API_RESPONSE.status == 200):
@@ -207,9 +200,7 @@ def getWorkflows(config):
     request_body = ''
     receivedWorkFlows = False
     workflowIdList = []
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
 
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
     if AMC_API_RESPONSE.status == 200:
@@ -246,9 +237,7 @@ def getExecutionStatusByWorkflowId(config, workflowId):
 
     url = "{}/workflowExecutions/?workflowId={}".format(config['AMC']['amcApiEndpoint'], workflowId)
 
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
     if (AMC_API_RESPONSE.status == 200):
@@ -280,9 +269,7 @@ def getExecutionStatusByWorkFlowExecutionId(config, workflowExecutionId):
     request_method = 'GET'
     request_body = ''
     url = "{}/workflowExecutions/{}".format(config['AMC']['amcApiEndpoint'], workflowExecutionId)
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
     if (AMC_API_RESPONSE.status == 200):
@@ -319,9 +306,7 @@ def createWorkflow(config, payload):
     message = ''
     request_method = 'POST'
     request_body = json.dumps(payload)
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
     if (AMC_API_RESPONSE.status == 200):
@@ -360,9 +345,7 @@ def updateWorkflow(config, payload):
     url = "{}/workflows/{}".format(config['AMC']['amcApiEndpoint'], payload['workflowId'])
     request_method = 'PUT'
     request_body = json.dumps(payload)
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
     if (AMC_API_RESPONSE.status == 200):
@@ -393,9 +376,7 @@ def deleteWorkflow(config, payload):
     url = "{}/workflows/{}".format(config['AMC']['amcApiEndpoint'], payload['workflowId'])
     request_method = 'DELETE'
     request_body = json.dumps(payload)
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
     logger.info('Workflow delete response {}'.format(AMC_API_RESPONSE))
@@ -430,9 +411,7 @@ def delete_schedules(config, payload):
         url = "{}/schedules/{}".format(config['AMC']['amcApiEndpoint'], schedule_id)
         request_method = 'DELETE'
         request_body = json.dumps(payload)
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=getSignedHeaders(config, request_method, url,
-                                                                                  request_body), body=request_body)
+        AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
         logger.info('schedule delete response {}'.format(AMC_API_RESPONSE))
@@ -465,9 +444,7 @@ def get_schedules(config):
     request_method = 'GET'
     request_body = ''
     logger.info('get workflow request URL: {}'.format(url))
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     logger.info('response data: {}'.format(AMC_API_RESPONSE.data))
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
@@ -501,9 +478,7 @@ def get_workflow(config, payload):
     request_method = 'GET'
     request_body = ''
     logger.info('get workflow request URL: {}'.format(url))
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     logger.info('response data: {}'.format(AMC_API_RESPONSE.data))
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
@@ -537,9 +512,7 @@ def deleteWorkflowExecution(config, payload):
 
     request_method = 'DELETE'
     request_body = json.dumps(payload)
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
     logger.info(
@@ -0,0 +1,104 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+#!/usr/bin/env python3
+# File Name: ExecutionConcurrencyCounter.py
+# Description:
+# This lambda is a trigger for the workflow status table that keeps the number of RUNNING and PENDING executions of
+# each customer in the execution concurrency table, so the queue consumer does not have to count them on every run
+
+import boto3
+import os
+from collections import defaultdict
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="WorkFlowManagement", level="INFO")
+
+# execution statuses counted against the maximumConcurrentWorkflowExecutions of a customer, and their counter
+COUNTED_STATUSES = {
+    'RUNNING': 'executionsRunning',
+    'PENDING': 'executionsPending'
+}
+
+dynamodb = boto3.client('dynamodb')
+
+
+def get_counter_changes(records):
+    # an execution leaving a counted status is removed from its counter, an execution entering one is added
+    changes = defaultdict(lambda: defaultdict(int))
+    for record in records:
+        if 'dynamodb' not in record:
+            continue
+        customer_id = record['dynamodb']['Keys']['customerId']['S']
+        for image_name, change in (('OldImage', -1), ('NewImage', 1)):
+            image = record['dynamodb'].get(image_name, {})
+            if 'S' in image.get('executionStatus', {}) and image['executionStatus']['S'] in COUNTED_STATUSES:
+                changes[customer_id][COUNTED_STATUSES[image['executionStatus']['S']]] += change
+    return changes
+
+
+def get_last_sequence_numbers(records):
+    # stream sequence numbers increase with the order the records were written in, they fit a DynamoDB number
+    last_sequence_numbers = {}
+    for record in records:
+        if 'dynamodb' not in record:
+            continue
+        customer_id = record['dynamodb']['Keys']['customerId']['S']
+        sequence_number = int(record['dynamodb']['SequenceNumber'])
+        last_sequence_numbers[customer_id] = max(sequence_number, last_sequence_numbers.get(customer_id, 0))
+    return last_sequence_numbers
+
+
+def lambda_handler(event, context):
+    counter_changes = get_counter_changes(event['Records'])
+    last_sequence_numbers = get_last_sequence_numbers(event['Records'])
+
+    failed_customer_ids = []
+    for customer_id, changes in counter_changes.items():
+        changes = {counter: change for counter, change in changes.items() if change != 0}
+        if not changes:
+            continue
+
+        # ADD is not idempotent: the last sequence number applied to the counters of the customer is stored with
+        # them, so the changes of a batch retried by the event source mapping are only added once. The queue
+        # consumer reconciles the counters with the execution status table when they have never been reconciled
+        expression_attribute_names = {'#{}'.format(counter): counter for counter in changes}
+        expression_attribute_names['#lastSequenceNumber'] = 'lastSequenceNumber'
+        expression_attribute_values = {':{}'.format(counter): {'N': str(change)} for counter, change in changes.items()}
+        expression_attribute_values[':lastSequenceNumber'] = {'N': str(last_sequence_numbers[customer_id])}
+        try:
+            dynamodb.update_item(
+                TableName=os.environ['EXECUTION_CONCURRENCY_DYNAMODB_TABLE'],
+                Key={'customerId': {'S': customer_id}},
+                UpdateExpression='SET #lastSequenceNumber = :lastSequenceNumber ADD {}'.format(
+                    ', '.join('#{0} :{0}'.format(counter) for counter in changes)),
+                ConditionExpression='attribute_not_exists(#lastSequenceNumber) OR '
+                                    '#lastSequenceNumber < :lastSequenceNumber',
+                ExpressionAttributeNames=expression_attribute_names,
+                ExpressionAttributeValues=expression_attribute_values
+            )
+            logger.info('customerId {} execution counters changed by {}'.format(customer_id, changes))
+        except dynamodb.exceptions.ConditionalCheckFailedException:
+            logger.info('customerId {} execution counters already changed by {}'.format(customer_id, changes))
+        except Exception as ex:
+            logger.error('customerId {} execution counters could not be changed by {} error message: {}'.format(
+                customer_id, changes, ex))
+            failed_customer_ids.append(customer_id)
+
+    # the other customers are updated before the batch is retried, their changes are not added again by the retry
+    if failed_customer_ids:
+        raise RuntimeError('execution counters of customerIds {} could not be updated'.format(failed_customer_ids))
+
+    return {"customersUpdated": len(counter_changes)}
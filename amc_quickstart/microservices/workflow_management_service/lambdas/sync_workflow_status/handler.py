@@ -21,16 +21,13 @@
 
 import boto3
 import json
-from boto3 import Session
 import os
-import urllib3
 from urllib.parse import urlparse, urlencode, parse_qs, quote
-from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
 from datetime import datetime, timedelta, timezone
 from dateutil.parser import parse
 from aws_lambda_powertools import Logger
 from wfm import wfm_utils
+from wfm.amc_api_client import get_amc_api_client
 import math
 import time
 
@@ -38,12 +35,10 @@ logger = Logger(service="WorkFlowManagement", level="INFO")
 wfmutils = wfm_utils.Utils(logger)
 
 
-def getSignedHeaders(config, request_method, request_endpoint_url, request_body):
-    # Generate signed http headers for Sigv4
-    AWS_REGION = config['AMC']['amcInstanceRegion']
-    request = AWSRequest(method=request_method.upper(), url=request_endpoint_url, data=request_body)
-    SigV4Auth(Session().get_credentials(), "execute-api", AWS_REGION).add_auth(request)
-    return dict(request.headers.items())
+def sendRequest(config, request_method, request_endpoint_url, request_body):
+    # Sends a signed request over the pooled connections of the Lambda container
+    return get_amc_api_client().request(request_method, request_endpoint_url, config['AMC']['amcInstanceRegion'],
+                                        request_body)
 
 
 def getExecutionStatusesByMinCreationTime(config, minCreationTime):
@@ -62,9 +57,7 @@ def getExecutionStatusesByMinCreationTime(config, minCreationTime):
         receivedExecutionStatus = False
         url = "{}/workflowExecutions/?{}".format(config['AMC']['amcApiEndpoint'], urlencode(
             {'minCreationTime': minCreationTime, "nextToken": AMC_API_RESPONSE_DICTIONARY['nextToken']}))
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=getSignedHeaders(config, request_method, url,
-                                                                                  request_body), body=request_body)
+        AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
         statuses[url] = AMC_API_RESPONSE.status
 
@@ -95,9 +88,7 @@ def getExecutionStatusByWorkFlowExecutionId(config, workflowExecutionId):
     request_method = 'GET'
     request_body = ''
     url = "{}/workflowExecutions/{}".format(config['AMC']['amcApiEndpoint'], workflowExecutionId)
-    AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                     headers=getSignedHeaders(config, request_method, url,
-                                                                              request_body), body=request_body)
+    AMC_API_RESPONSE = sendRequest(config, request_method, url, request_body)
     workflow_status_response = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
     if (AMC_API_RESPONSE.status == 200):
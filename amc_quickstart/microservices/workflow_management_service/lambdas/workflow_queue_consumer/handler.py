@@ -15,21 +15,54 @@
 
 import json
 import boto3
-import urllib3
 import os
-from boto3 import Session
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from datetime import datetime
-from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
 from aws_lambda_powertools import Logger
 
 logger = Logger(service="WorkFlowManagement", level="INFO")
 
 from wfm import wfm_utils
+from wfm.amc_api_client import get_amc_api_client
 
 wfmutils = wfm_utils.Utils(logger)
 
+# sequential submits the workflow executions one at a time, concurrent submits up to
+# MAX_CONCURRENT_WORKFLOW_SUBMISSIONS of them at once (bounded by the executions available to the customer)
+WORKFLOW_SUBMISSION_MODE = os.environ.get('WORKFLOW_SUBMISSION_MODE', 'sequential').lower()
+MAX_CONCURRENT_WORKFLOW_SUBMISSIONS = int(os.environ.get('MAX_CONCURRENT_WORKFLOW_SUBMISSIONS', '10'))
+# the queue is not drained any further once less time than this is left before the Lambda function times out
+QUEUE_DRAIN_MIN_REMAINING_TIME_MS = int(os.environ.get('QUEUE_DRAIN_MIN_REMAINING_TIME_MS', '120000'))
+# RUNNING and PENDING execution counters per customer, the executions are counted on every run when it is not set
+EXECUTION_CONCURRENCY_DYNAMODB_TABLE = os.environ.get('EXECUTION_CONCURRENCY_DYNAMODB_TABLE')
+EXECUTION_COUNTERS_RECONCILE_SECONDS = int(os.environ.get('EXECUTION_COUNTERS_RECONCILE_SECONDS', '600'))
+# invoke starts one asynchronous invocation per customer, sqs sends the customerIds to CONSUMER_FANOUT_QUEUE_URL in
+# batches, the queue triggers this function for each customer
+CONSUMER_FANOUT_MODE = os.environ.get('CONSUMER_FANOUT_MODE', 'invoke').lower()
+CONSUMER_FANOUT_QUEUE_URL = os.environ.get('CONSUMER_FANOUT_QUEUE_URL')
+CUSTOMER_CONFIG_CACHE_TTL_SECONDS = int(os.environ.get('CUSTOMER_CONFIG_CACHE_TTL_SECONDS', '300'))
+
+# customerId -> (expiry time, customer config), shared by the invocations of a Lambda container
+customer_config_cache = {}
+
+
+def cache_customer_configs(customer_configs):
+    expiry_time = time.monotonic() + CUSTOMER_CONFIG_CACHE_TTL_SECONDS
+    for customer_id, customer_config in customer_configs.items():
+        customer_config_cache[customer_id] = (expiry_time, customer_config)
+
+
+def get_customer_config(customers_dynamodb_table_name, customer_id):
+    cached = customer_config_cache.get(customer_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    customer_configs = wfmutils.dynamodb_get_customer_config_records(customers_dynamodb_table_name, customer_id)
+    cache_customer_configs(customer_configs)
+    return customer_configs[customer_id]
+
 
 def updateExeuctionTrackingTable(customerConfig, executions):
     table = boto3.resource('dynamodb').Table(
@@ -50,13 +83,6 @@ def updateExeuctionTrackingTable(customerConfig, executions):
                 )
 
 
-def getSignedHeaders(request_method, request_url, region, request_body):
-    # Generate signed http headers for Sigv4
-    request = AWSRequest(method=request_method.upper(), url=request_url, data=request_body)
-    SigV4Auth(Session().get_credentials(), "execute-api", region).add_auth(request)
-    return dict(request.headers.items())
-
-
 def getOffsetValue(offset_string):
     return (int(offset_string.split('(')[1].split(')')[0]))
 
@@ -74,7 +100,7 @@ def processParameterFunctions(parameter):
     return parameter
 
 
-def executeWorkflow(customerConfig, event):
+def executeWorkflow(customerConfig, event, publish_failures=True):
     executedWorkflow = False
     payload = event['payload']
     message = ''
@@ -94,13 +120,8 @@ def executeWorkflow(customerConfig, event):
     request_method = 'POST'
     request_body = json.dumps(payload)
     try:
-        AMC_API_RESPONSE = urllib3.PoolManager().request(request_method, url,
-                                                         headers=getSignedHeaders(request_method, url,
-                                                                                  customerConfig[
-                                                                                      'AMC'][
-                                                                                      'amcInstanceRegion'],
-                                                                                  request_body),
-                                                         body=request_body)
+        AMC_API_RESPONSE = get_amc_api_client().request(request_method, url,
+                                                        customerConfig['AMC']['amcInstanceRegion'], request_body)
         AMC_API_RESPONSE_DICTIONARY = json.loads(AMC_API_RESPONSE.data.decode("utf-8"))
 
         if (AMC_API_RESPONSE.status == 200):
@@ -132,12 +153,52 @@ def executeWorkflow(customerConfig, event):
             'body': {}
         }
 
-    if not executedWorkflow:
+    if not executedWorkflow and publish_failures:
         wfmutils.sns_publish_message(customerConfig['AMC']['WFM']['snsTopicArn'], message, returnValue)
 
     return returnValue
 
 
+def submit_workflow_executions(customer_config, run_workflow_requests, max_concurrent_submissions):
+    if WORKFLOW_SUBMISSION_MODE != 'concurrent' or max_concurrent_submissions <= 1 or len(
+            run_workflow_requests) <= 1:
+        return [executeWorkflow(customer_config, request) for request in run_workflow_requests]
+
+    # the failures are published once all the submissions are done, boto3 clients are not created from the threads
+    with ThreadPoolExecutor(max_workers=min(max_concurrent_submissions, len(run_workflow_requests))) as executor:
+        responses = list(executor.map(lambda request: executeWorkflow(customer_config, request, False),
+                                      run_workflow_requests))
+    for response in responses:
+        if response['statusCode'] != 200:
+            wfmutils.sns_publish_message(customer_config['AMC']['WFM']['snsTopicArn'], response['message'], response)
+    return responses
+
+
+def delete_messages(queue, messages):
+    messages_deleted = 0
+    log_messages = []
+    # DeleteMessageBatch accepts up to 10 messages
+    for batch_start in range(0, len(messages), 10):
+        entries = [{'Id': str(index), 'ReceiptHandle': message.receipt_handle}
+                   for index, message in enumerate(messages[batch_start:batch_start + 10])]
+        try:
+            response = queue.delete_messages(Entries=entries)
+        except Exception as ex:
+            message = "Error occured when trying to delete {} messages from queue {} error message: {}".format(
+                len(entries), queue.url, ex)
+            log_messages.append(message)
+            logger.error(message)
+            continue
+
+        messages_deleted += len(response.get('Successful', []))
+        for failure in response.get('Failed', []):
+            message = "Error occured when trying to delete message {} from queue {} error message: {}".format(
+                messages[batch_start + int(failure['Id'])].message_id, queue.url, failure.get('Message'))
+            log_messages.append(message)
+            logger.error(message)
+    return messages_deleted, log_messages
+
+
 def get_running_and_pending_executions(customer_config):
     executions_running = 0
     executions_pending = 0
@@ -224,7 +285,7 @@ def get_running_and_pending_executions(customer_config):
     })
 
 
-def get_number_of_executions_available(customer_config):
+def count_running_and_pending_executions(customer_config):
     executions_running = 0
     executions_pending = 0
     # Set up a DynamoDB Connection
@@ -291,12 +352,97 @@ def get_number_of_executions_available(customer_config):
     if executionsResponse['ResponseMetadata']['HTTPStatusCode'] == 200:
         executions_pending = int(executionsResponse['Count'])
 
-        executionsAvailable = int(
-            customer_config['AMC']['maximumConcurrentWorkflowExecutions']) - executions_pending - executions_running
-        logmessage = 'customerId {} Currently has {} RUNNING executions and {} PENDING executions, maximumConcurrentWorkflowExecutions {}, Available executions: {}'.format(
-            customer_config['customerId'], executions_running, executions_pending,
-            customer_config['AMC']['maximumConcurrentWorkflowExecutions'], executionsAvailable)
-        logger.info(logmessage)
+    return executions_running, executions_pending
+
+
+def reconcile_execution_counters(dynamodb, customer_config, counters):
+    # Resets the counters to a count of the executions, only if the counter item is still the one that was read:
+    # another reconcile, or a stream ADD made since the read, fails the condition and keeps the counters as they are.
+    # The last stream sequence number applied is kept, so a retried stream batch is not counted again
+    executions_running, executions_pending = count_running_and_pending_executions(customer_config)
+
+    if counters is None:
+        condition_expression = 'attribute_not_exists(customerId)'
+        expression_attribute_names = None
+        expression_attribute_values = None
+    else:
+        conditions = []
+        expression_attribute_names = {}
+        expression_attribute_values = {}
+        for attribute in ('executionsRunning', 'executionsPending', 'reconciledTime', 'lastSequenceNumber'):
+            expression_attribute_names['#{}'.format(attribute)] = attribute
+            if attribute in counters:
+                conditions.append('#{0} = :{0}'.format(attribute))
+                expression_attribute_values[':{}'.format(attribute)] = counters[attribute]
+            else:
+                conditions.append('attribute_not_exists(#{})'.format(attribute))
+        condition_expression = ' AND '.join(conditions)
+
+    put_item_arguments = {
+        'TableName': EXECUTION_CONCURRENCY_DYNAMODB_TABLE,
+        'Item': {
+            'customerId': {'S': customer_config['customerId']},
+            'executionsRunning': {'N': str(executions_running)},
+            'executionsPending': {'N': str(executions_pending)},
+            'reconciledTime': {'N': str(int(time.time()))}
+        },
+        'ConditionExpression': condition_expression
+    }
+    if counters is not None and 'lastSequenceNumber' in counters:
+        put_item_arguments['Item']['lastSequenceNumber'] = counters['lastSequenceNumber']
+    if expression_attribute_names:
+        put_item_arguments['ExpressionAttributeNames'] = expression_attribute_names
+    if expression_attribute_values:
+        put_item_arguments['ExpressionAttributeValues'] = expression_attribute_values
+
+    try:
+        dynamodb.put_item(**put_item_arguments)
+        logger.info('customerId {} execution counters reconciled'.format(customer_config['customerId']))
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        logger.info('customerId {} execution counters changed while they were reconciled, they are reconciled by a '
+                    'later run'.format(customer_config['customerId']))
+    return executions_running, executions_pending
+
+
+def get_execution_counters(customer_config):
+    if not EXECUTION_CONCURRENCY_DYNAMODB_TABLE:
+        return count_running_and_pending_executions(customer_config)
+
+    dynamodb = boto3.client('dynamodb')
+    counters = dynamodb.get_item(
+        TableName=EXECUTION_CONCURRENCY_DYNAMODB_TABLE,
+        Key={'customerId': {'S': customer_config['customerId']}},
+        ConsistentRead=True
+    ).get('Item')
+
+    # the counters are kept by the execution status table stream, they are reconciled with a count of the
+    # executions when they are missing or were last reconciled more than EXECUTION_COUNTERS_RECONCILE_SECONDS ago
+    if counters is None or 'reconciledTime' not in counters or int(
+            counters['reconciledTime']['N']) + EXECUTION_COUNTERS_RECONCILE_SECONDS < time.time():
+        return reconcile_execution_counters(dynamodb, customer_config, counters)
+
+    executions_running = int(counters.get('executionsRunning', {'N': '0'})['N'])
+    executions_pending = int(counters.get('executionsPending', {'N': '0'})['N'])
+
+    # an undercounting counter would let more executions be submitted than the customer allows, a counter at zero
+    # (or below, after a change was counted twice) is checked against a count of the executions
+    if executions_running <= 0 or executions_pending <= 0:
+        counted_running, counted_pending = count_running_and_pending_executions(customer_config)
+        executions_running = max(executions_running, counted_running)
+        executions_pending = max(executions_pending, counted_pending)
+
+    return max(0, executions_running), max(0, executions_pending)
+
+
+def get_number_of_executions_available(customer_config):
+    executions_running, executions_pending = get_execution_counters(customer_config)
+
+    executionsAvailable = int(
+        customer_config['AMC']['maximumConcurrentWorkflowExecutions']) - executions_pending - executions_running
+    logmessage = 'customerId {} Currently has {} RUNNING executions and {} PENDING executions, maximumConcurrentWorkflowExecutions {}, Available executions: {}'.format(
+        customer_config['customerId'], executions_running, executions_pending,
+        customer_config['AMC']['maximumConcurrentWorkflowExecutions'], executionsAvailable)
+    logger.info(logmessage)
 
     return ({
         "customerId": customer_config['customerId'],
@@ -332,12 +478,42 @@ def invoke_consume_queue(customer_config):
     return response
 
 
-def process_queue(customer_config_record):
+def send_consume_queue_messages(customer_ids):
+    sqs = boto3.client('sqs')
+    # SendMessageBatch accepts up to 10 messages, the batches are sent in parallel
+    batches = [customer_ids[batch_start:batch_start + 10] for batch_start in range(0, len(customer_ids), 10)]
+
+    def send_batch(batch):
+        response = sqs.send_message_batch(
+            QueueUrl=CONSUMER_FANOUT_QUEUE_URL,
+            Entries=[{
+                'Id': str(index),
+                'MessageBody': json.dumps({"method": 'consumequeue', "customerId": customer_id})
+            } for index, customer_id in enumerate(batch)]
+        )
+        failed = [batch[int(failure['Id'])] for failure in response.get('Failed', [])]
+        for customer_id in failed:
+            logger.error('Failed to send the consume queue message of customerId {}'.format(customer_id))
+        return [{
+            "customerId": customer_id,
+            "statusCode": 500 if customer_id in failed else 200
+        } for customer_id in batch]
+
+    responses = []
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(len(batches), 10)) as executor:
+            for batch_responses in executor.map(send_batch, batches):
+                responses += batch_responses
+
+    logger.info('Sent the consume queue messages of {} customers to {}'.format(len(customer_ids),
+                                                                               CONSUMER_FANOUT_QUEUE_URL))
+    return responses
+
+
+def process_queue(customer_config_record, context=None):
     log_messages = []
     workflow_execution_responses = []
     workflow_execution_response_codes = [200]
-    executions_available = 0
-    executions_submitted_count = 0
     executions_submitted = []
     messages_deleted = 0
     messages_received = []
@@ -349,23 +525,36 @@ def process_queue(customer_config_record):
         QueueName=customer_config_record['AMC']['WFM']['amcWorkflowExecutionSQSQueueName'])
     logger.info('customerId: {} executionsAvailable: {}'.format(customer_config_record['customerId'],
                                                                 executions_available_result['executionsAvailable']))
-    if executions_available_result['executionsAvailable'] > 0:
-        messagesToReceive = executions_available_result['executionsAvailable']
-        if executions_available_result['executionsAvailable'] > 10:
-            messagesToReceive = 10
-
-        messages_received = queue.receive_messages(MessageAttributeNames=['customerId', 'workflowId'],
-                                                   MaxNumberOfMessages=messagesToReceive)
-        messages_received_count = len(messages_received)
+
+    # Drain the queue 10 messages (the SQS maximum) at a time until the executions available are used, the queue is
+    # empty or the Lambda function is about to time out
+    executions_remaining = executions_available_result['executionsAvailable']
+    while executions_remaining > 0:
+        if context is not None and context.get_remaining_time_in_millis() < QUEUE_DRAIN_MIN_REMAINING_TIME_MS:
+            logmessage = 'Stopped draining the queue of customerId {} with {} executions still available, ' \
+                         'the function is about to time out'.format(customer_config_record['customerId'],
+                                                                    executions_remaining)
+            logger.warning(logmessage)
+            log_messages.append(logmessage)
+            break
+
+        messagesToReceive = min(executions_remaining, 10)
+        messages = queue.receive_messages(MessageAttributeNames=['customerId', 'workflowId'],
+                                          MaxNumberOfMessages=messagesToReceive)
         logger.info('customerId: {} sqs queue: {} messages received: {}'.format(customer_config_record['customerId'],
                                                                                 customer_config_record['AMC']['WFM'][
                                                                                     'amcWorkflowExecutionSQSQueueName'],
-                                                                                messages_received_count))
-        for message in messages_received:
-            customerId = ''
-            workflowId = ''
-            runWorkflowResponse = {}
-            runWorkflowRequest = {}
+                                                                                len(messages)))
+        if not messages:
+            break
+        messages_received += messages
+        # the messages whose submission failed are only visible again after their visibility timeout, counting
+        # them keeps them from being received again in this loop
+        executions_remaining -= len(messages)
+
+        run_workflow_messages = []
+        run_workflow_requests = []
+        for message in messages:
             if message.message_attributes is not None:
                 customerId = message.message_attributes.get('customerId').get('StringValue')
                 workflowId = message.message_attributes.get('workflowId').get('StringValue')
@@ -374,43 +563,50 @@ def process_queue(customer_config_record):
                                                                                              message.body))
                 messageBody = json.loads(message.body)
 
-                runWorkflowRequest = {
+                run_workflow_messages.append((message, customerId, workflowId))
+                run_workflow_requests.append({
                     'workflowId': workflowId,
                     'customerConfig': customer_config_record,
                     'amcApiEndpoint': customer_config_record['AMC']['amcApiEndpoint'],
                     'payload': messageBody['payload']
-                }
-
-                runWorkflowResponse = executeWorkflow(customer_config_record, runWorkflowRequest.copy())
-                logger.info('runWorkflowResponse:{}'.format(runWorkflowResponse))
-
-                workflow_execution_responses.append(runWorkflowResponse.copy())
-                workflow_execution_response_codes.append(runWorkflowResponse['statusCode'])
-
-                if runWorkflowResponse['statusCode'] == 200:
-                    workflowExecutionId = runWorkflowResponse['body']['workflowExecutionId']
-                    executions_submitted.append(
-                        {"customerId": customerId, 'workflowId:': workflowId, "executionId": workflowExecutionId,
-                         "amcApiEndpoint": customer_config_record['AMC']['amcApiEndpoint'],
-                         "statusCode": runWorkflowResponse['statusCode']})
-
-                    logmessage = " Successfully submitted workflow execution for workflowId: {} workflowExecutionId: {}".format(
-                        workflowId, workflowExecutionId)
-                    updateExeuctionTrackingTable(customer_config_record, runWorkflowResponse['body'])
-
-                    logger.info(logmessage)
-                    log_messages.append(logmessage)
-                    # Let the queue know that the message is processed
-                    try:
-                        message.delete()
-                        logger.info('Deleted Message for customerid {} workflowid{}'.format(customerId, workflowId))
-                        messages_deleted += 1
-
-                    except Exception as ex:
-                        message = "Error occured when trying to submit workflow execution url: {} error message: {}".format(
-                            customer_config_record['AMC']['amcApiEndpoint'], ex)
-                        log_messages.append(message)
-                        logger.error(message)
+                })
+
+        runWorkflowResponses = submit_workflow_executions(
+            customer_config_record, run_workflow_requests,
+            min(executions_available_result['executionsAvailable'], MAX_CONCURRENT_WORKFLOW_SUBMISSIONS))
+
+        executions_to_track = []
+        messages_to_delete = []
+        for (message, customerId, workflowId), runWorkflowResponse in zip(run_workflow_messages,
+                                                                           runWorkflowResponses):
+            logger.info('runWorkflowResponse:{}'.format(runWorkflowResponse))
+
+            workflow_execution_responses.append(runWorkflowResponse.copy())
+            workflow_execution_response_codes.append(runWorkflowResponse['statusCode'])
+
+            if runWorkflowResponse['statusCode'] == 200:
+                workflowExecutionId = runWorkflowResponse['body']['workflowExecutionId']
+                executions_submitted.append(
+                    {"customerId": customerId, 'workflowId:': workflowId, "executionId": workflowExecutionId,
+                     "amcApiEndpoint": customer_config_record['AMC']['amcApiEndpoint'],
+                     "statusCode": runWorkflowResponse['statusCode']})
+
+                logmessage = " Successfully submitted workflow execution for workflowId: {} workflowExecutionId: {}".format(
+                    workflowId, workflowExecutionId)
+                logger.info(logmessage)
+                log_messages.append(logmessage)
+                executions_to_track.append(runWorkflowResponse['body'])
+                messages_to_delete.append(message)
+
+        if executions_to_track:
+            updateExeuctionTrackingTable(customer_config_record, executions_to_track)
+
+        # Let the queue know that the messages are processed
+        batch_messages_deleted, delete_log_messages = delete_messages(queue, messages_to_delete)
+        messages_deleted += batch_messages_deleted
+        log_messages += delete_log_messages
+        logger.info('Deleted {} messages for customerid {}'.format(batch_messages_deleted,
+                                                                   customer_config_record['customerId']))
 
     return ({
         'statusCode': max(workflow_execution_response_codes),
@@ -432,6 +628,17 @@ def lambda_handler(event, context):
     logger.info('event received {}'.format(event))
     customers_dynamodb_table_name = os.environ['CUSTOMERS_DYNAMODB_TABLE']
 
+    # consume queue messages sent by send_consume_queue_messages
+    if 'Records' in event:
+        results = []
+        for record in event['Records']:
+            customer_id = json.loads(record['body'])['customerId']
+            process_queue_results = process_queue(get_customer_config(customers_dynamodb_table_name, customer_id),
+                                                  context)
+            logger.info(process_queue_results)
+            results.append(process_queue_results)
+        return results
+
     if 'method' in event:
         if event['method'].lower() == 'getexecutionsavailable':
             if 'customerId' in event:
@@ -454,15 +661,13 @@ def lambda_handler(event, context):
             if 'customerId' in event:
 
                 if 'customerConfig' in event:
-                    process_queue_results = process_queue(event['customerConfig'])
+                    process_queue_results = process_queue(event['customerConfig'], context)
                     results.append(process_queue_results.copy())
                     logger.info(process_queue_results)
                     return process_queue_results
                 else:
-                    get_customer_config_records_results = wfmutils.dynamodb_get_customer_config_records(
-                        customers_dynamodb_table_name, event['customerId'])
-                    customer_config = get_customer_config_records_results[event['customerId']]
-                    process_queue_results = process_queue(customer_config)
+                    customer_config = get_customer_config(customers_dynamodb_table_name, event['customerId'])
+                    process_queue_results = process_queue(customer_config, context)
                     logger.info(process_queue_results)
                     return (process_queue_results)
             else:
@@ -483,10 +688,16 @@ def lambda_handler(event, context):
     all_workflow_execution_response_codes = [200]
     logger.info('No method specified, Consuming All queues')
     customer_config_records = wfmutils.dynamodb_get_customer_config_records(customers_dynamodb_table_name)
-    for customer_id in customer_config_records:
-        invoke_process_queue_results = invoke_consume_queue(customer_config_records[customer_id])
-        results.append(invoke_process_queue_results.copy())
-        all_workflow_execution_response_codes.append(invoke_process_queue_results['statusCode'])
+    cache_customer_configs(customer_config_records)
+
+    if CONSUMER_FANOUT_MODE == 'sqs':
+        results = send_consume_queue_messages(list(customer_config_records))
+        all_workflow_execution_response_codes += [result['statusCode'] for result in results]
+    else:
+        for customer_id in customer_config_records:
+            invoke_process_queue_results = invoke_consume_queue(customer_config_records[customer_id])
+            results.append(invoke_process_queue_results.copy())
+            all_workflow_execution_response_codes.append(invoke_process_queue_results['statusCode'])
 
     logger.info(results)
     return {
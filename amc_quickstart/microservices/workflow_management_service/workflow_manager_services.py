@@ -28,7 +28,8 @@ import aws_cdk.aws_dynamodb as DDB
 from aws_cdk.aws_athena import CfnWorkGroup
 from aws_cdk.aws_s3 import Bucket, IBucket
 from aws_cdk.aws_events import CfnRule
-from aws_ddk_core.resources import KMSFactory, LambdaFactory
+from aws_cdk.aws_sqs import QueueEncryption
+from aws_ddk_core.resources import KMSFactory, LambdaFactory, SQSFactory
 
 
 def get_ssm_value(scope, id: str, parameter_name: str) -> str:
@@ -132,6 +133,24 @@ class WorkFlowManagerService(BaseStack):
                 },
         )
 
+        self._amc_execution_concurrency_table = self._create_ddb_table(
+            name=f"{self._microservice_name}-{self._team}-AMCExecutionConcurrency",
+            ddb_props={"partition_key": DDB.Attribute(name="customerId", type=DDB.AttributeType.STRING)},
+        )
+
+        # SQS Queue fanning out the consume queue runs of the customers, a message is only worth a run in the minute
+        # it was sent in so it is neither retried nor kept long
+        consumer_fanout_queue_name = f"{self._microservice_name}-{self._team}-{self._environment_id}-workflowExecutionConsumerFanout"
+        self._consumer_fanout_queue = SQSFactory.queue(
+            self,
+            id=consumer_fanout_queue_name,
+            environment_id = self._environment_id,
+            queue_name=consumer_fanout_queue_name,
+            visibility_timeout=cdk.Duration.minutes(16),
+            retention_period=cdk.Duration.minutes(15),
+            encryption=QueueEncryption.KMS,
+            encryption_master_key=self._wfm_masker_key)
+
         # SNS Topic Creation
         self._sns_topic = self._create_sns_topic(topic_name_prefix=f"{self._microservice_name}-{self._team}")
 
@@ -335,6 +354,18 @@ class WorkFlowManagerService(BaseStack):
                 ],
                 projection_type=DDB.ProjectionType.INCLUDE
             )
+        elif name.split("-")[-1] == "AMCExecutionConcurrency":
+            # counters written from the AMCExecutionStatus stream, nothing consumes a stream of their own
+            table: DDB.Table = DDB.Table(
+                self,
+                f"{name}-{self._environment_id}-table",
+                table_name=f"{name}-{self._environment_id}",
+                encryption=DDB.TableEncryption.CUSTOMER_MANAGED,
+                encryption_key=self._wfm_masker_key,
+                billing_mode=DDB.BillingMode.PAY_PER_REQUEST,
+                removal_policy= cdk.RemovalPolicy.DESTROY,
+                **ddb_props,
+            )
         else:
             table: DDB.Table = DDB.Table(
                 self,
@@ -472,6 +503,33 @@ class WorkFlowManagerService(BaseStack):
             retry_attempts=1
         )
 
+        # ExecutionConcurrencyCounter
+        execution_concurrency_counter = LambdaFactory.function(
+            self,
+            f"{function_name_prefix}-ExecutionConcurrencyCounter-{self._environment_id}",
+            environment_id = self._environment_id,
+            function_name=f"{function_name_prefix}-ExecutionConcurrencyCounter-{self._environment_id}",
+            code=Code.from_asset(os.path.join(f"{Path(__file__).parents[1]}", "workflow_management_service/lambdas/execution_concurrency_counter")),
+            handler="handler.lambda_handler",
+            description="A lambda function that process a DynamoDB Stream of workflow statuses to count the RUNNING and PENDING executions of each customer",
+            memory_size=256,
+            timeout=cdk.Duration.minutes(1),
+            runtime = Runtime.PYTHON_3_8,
+            layers = [self._wfm_helper_layer, self._powertools_layer],
+            environment={
+                "EXECUTION_CONCURRENCY_DYNAMODB_TABLE": self._amc_execution_concurrency_table.table_name
+            },
+            role=self._execution_concurrency_counter_role
+        )
+
+        execution_concurrency_counter.add_event_source_mapping(
+            "lambda-ddb-concurrency-event-source-mapping",
+            batch_size=100,
+            event_source_arn=self._amc_execution_status_table.table_stream_arn,
+            starting_position=StartingPosition.LATEST,
+            retry_attempts=2
+        )
+
         # AMC API Interface
         self._lambda_amc_api_interface = LambdaFactory.function(
             self,
@@ -534,11 +592,21 @@ class WorkFlowManagerService(BaseStack):
             runtime = Runtime.PYTHON_3_8,
             layers = [self._wfm_helper_layer, self._powertools_layer],
             environment={
-                "CUSTOMERS_DYNAMODB_TABLE": self._customer_config_table.table_name
+                "CUSTOMERS_DYNAMODB_TABLE": self._customer_config_table.table_name,
+                "WORKFLOW_SUBMISSION_MODE": "concurrent",
+                "EXECUTION_CONCURRENCY_DYNAMODB_TABLE": self._amc_execution_concurrency_table.table_name,
+                "CONSUMER_FANOUT_MODE": "sqs",
+                "CONSUMER_FANOUT_QUEUE_URL": self._consumer_fanout_queue.queue_url
             },
             role=self._event_queue_consumer_role
         )
 
+        self._execution_queue_consumer.add_event_source_mapping(
+            "lambda-sqs-fanout-event-source-mapping",
+            batch_size=1,
+            event_source_arn=self._consumer_fanout_queue.queue_arn
+        )
+
         # Lambda Workflow Execution Queue Producer
         lambda_events_queue_producer = LambdaFactory.function(
             self,
@@ -1120,6 +1188,29 @@ class WorkFlowManagerService(BaseStack):
             )
         )
 
+        # DDB - Read and Write AMC Execution Concurrency DynamoDB
+        ddb_write_execution_concurrency_policy = ManagedPolicy(
+            self,
+            f"{name_prefix}-WFM-DynamoDB-ExecutionConcurrency-RW-1",
+            managed_policy_name=f"{name_prefix}-{cdk.Aws.REGION}-Workflowmgr-DynamoDB-ExecutionConcurrency-RW-1",
+            description= "Allows Read and Write Access to the AMC Execution Concurrency DDB Table",
+            document=PolicyDocument(
+                statements=[
+                    PolicyStatement(
+                        effect=Effect.ALLOW,
+                        actions=[
+                            "dynamodb:GetItem",
+                            "dynamodb:PutItem",
+                            "dynamodb:UpdateItem"
+                        ],
+                        resources=[
+                            self._amc_execution_concurrency_table.table_arn
+                        ]
+                    )
+                ]
+            )
+        )
+
         # DDB - Write Customer Config DynamoDB
         ddb_write_config_policy = ManagedPolicy(
             self,
@@ -1435,7 +1526,22 @@ class WorkFlowManagerService(BaseStack):
                 sqs_execution_queue_policy,
                 sns_publish_policy,
                 kms_decrypt_snssqs_key_policy,
-                lambda_invoke_execution_consumer
+                lambda_invoke_execution_consumer,
+                ddb_write_execution_concurrency_policy
+            ]
+        )
+
+        # IAM Role ExecutionConcurrencyCounter
+        self._execution_concurrency_counter_role = Role(
+            self,
+            "IAM Role ExecutionConcurrencyCounter 1",
+            description=f"Role for the ExecutionConcurrencyCounter Lambda for {name_prefix}",
+            assumed_by=ServicePrincipal("lambda.amazonaws.com"),
+            managed_policies=[
+                ManagedPolicy.from_aws_managed_policy_name("service-role/AWSLambdaBasicExecutionRole"),
+                ddb_read_execution_policy,
+                ddb_write_execution_concurrency_policy,
+                kms_decrypt_snssqs_key_policy
             ]
         )
 
@@ -0,0 +1,259 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Offline benchmark of the heavy transform (stage B) CSV to Parquet conversion.
+
+Synthetic AMC shaped CSV files are fed to process_files of the Glue script with in memory
+stand-ins for S3 and the Glue catalog, so no AWS account is needed. Each scenario runs in its
+own process to report its peak RSS next to the rows/sec and the per phase timings.
+
+Requires pandas, numpy, pyarrow, boto3 and awswrangler (the Glue job dependencies):
+
+    python3 scripts/benchmarks/heavy_transform_benchmark.py --rows 10000 100000 --columns 20 80
+"""
+
+import argparse
+import importlib.util
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+
+GLUE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'amc_quickstart', 'foundations',
+                           'glue', 'pyshell_scripts', 'sdlf_heavy_transform', 'main.py')
+
+PHASES = ['parse', 'infer', 'cast', 'encode', 'upload', 'catalog']
+
+# column name stems, the override ones match column_datatype_override of the Glue script
+PLAIN_COLUMNS = ['campaign', 'advertiser', 'creative_size', 'device_type', 'impressions', 'clicks', 'conversions',
+                 'purchases', 'units_sold', 'is_new_to_brand', 'region', 'browser_family']
+OVERRIDE_COLUMNS = ['total_cost', 'supply_fee', 'click_rate', 'ecpm', 'avg_frequency', 'reach_pct', 'campaign_id',
+                    'view_score']
+
+
+class FakeBody:
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, amt=None):
+        return self._stream.read(-1 if amt is None else amt)
+
+
+class FakeS3Client:
+    """In memory stand-in for the calls the Glue script makes to S3"""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, Metadata=None):
+        self.objects[(Bucket, Key)] = (Body, Metadata or {})
+
+    def get_object(self, Bucket, Key):
+        body, metadata = self.objects[(Bucket, Key)]
+        return {'Body': FakeBody(body), 'ContentLength': len(body), 'Metadata': metadata}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.objects[(Bucket, Key)] = (Fileobj.read(), {})
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Config=None):
+        with open(Filename, 'rb') as f:
+            self.objects[(Bucket, Key)] = (f.read(), {})
+
+
+class FakeGlueClient:
+    """In memory stand-in for the Glue catalog calls of the Glue script"""
+
+    class exceptions:
+        class EntityNotFoundException(Exception):
+            pass
+
+    def __init__(self):
+        self.tables = {}
+        self.partitions = {}
+
+    def get_table(self, DatabaseName, Name):
+        if (DatabaseName, Name) not in self.tables:
+            raise self.exceptions.EntityNotFoundException(Name)
+        return {'Table': self.tables[(DatabaseName, Name)]}
+
+    def update_table(self, DatabaseName, TableInput, **kwargs):
+        self.tables[(DatabaseName, TableInput['Name'])] = TableInput
+        return {}
+
+    def create_table(self, DatabaseName, TableInput, **kwargs):
+        self.tables[(DatabaseName, TableInput['Name'])] = TableInput
+        return {}
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        for partition_input in PartitionInputList:
+            self.partitions[(DatabaseName, TableName, tuple(partition_input['Values']))] = partition_input
+        return {'Errors': []}
+
+
+def load_glue_script():
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    spec = importlib.util.spec_from_file_location('sdlf_heavy_transform', GLUE_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    module.s3_client = FakeS3Client()
+    module.glue_client = FakeGlueClient()
+
+    def create_parquet_table(database, table, path, columns_types, partitions_types=None, compression=None,
+                             parameters=None, **kwargs):
+        module.glue_client.create_table(
+            DatabaseName=database,
+            TableInput=module.parquet_table_definition(table, path, columns_types, partitions_types or {},
+                                                       compression, parameters or {}))
+
+    module.wr.catalog.create_parquet_table = create_parquet_table
+    return module
+
+
+def column_names(columns, override_share):
+    override_count = int(round(columns * override_share))
+    names = [OVERRIDE_COLUMNS[i % len(OVERRIDE_COLUMNS)] for i in range(override_count)]
+    names += [PLAIN_COLUMNS[i % len(PLAIN_COLUMNS)] for i in range(columns - override_count)]
+    # the AMC reports never repeat a column name, the suffix keeps the override expressions matching
+    seen = set()
+    unique_names = []
+    for index, name in enumerate(names):
+        unique_names.append(name if name not in seen else f'{name}_{index}')
+        seen.add(name)
+    return unique_names
+
+
+def column_value(name, rng):
+    if name.startswith('campaign_id'):
+        return str(rng.randrange(10 ** 12))
+    if name.startswith('is_'):
+        return rng.choice(['true', 'false'])
+    if name.startswith(('campaign', 'advertiser', 'device_type', 'region', 'browser_family', 'creative_size')):
+        return '"{} \\"{}\\""'.format(name, rng.randrange(100))
+    if name.startswith(tuple(OVERRIDE_COLUMNS)):
+        return '{:.4f}'.format(rng.random() * 100)
+    return str(rng.randrange(10000))
+
+
+def generate_csv(rows, columns, filtered_share, override_share, seed=0):
+    rng = random.Random(seed)
+    names = column_names(columns, override_share)
+    lines = [','.join(names + ['filtered'])]
+    for _ in range(rows):
+        values = [column_value(name, rng) for name in names]
+        values.append('true' if rng.random() < filtered_share else 'false')
+        lines.append(','.join(values))
+    return ('\n'.join(lines) + '\n').encode('utf8')
+
+
+def run_scenario(scenario, result_queue):
+    module = load_glue_script()
+    module.logger.setLevel('WARNING')
+
+    data = generate_csv(scenario['rows'], scenario['columns'], scenario['filtered_share'],
+                        scenario['override_share'])
+    partitioned_path = ('benchmark_report_daily/customer_hash=benchmark/export_year=2022/export_month=01/'
+                        'export_day=01')
+    keys = []
+    for index in range(scenario['files']):
+        key = f'pre-stage/amc/benchmark/{partitioned_path}/report_{index}.csv'
+        module.s3_client.put_object(Bucket='benchmark', Key=key, Body=data, Metadata={
+            'partitionedpath': partitioned_path,
+            'filebasename': f'report_{index}',
+            'fileversion': '1',
+            'keydataset': 'benchmark',
+            'keyteam': 'amc',
+            'schedulefrequency': 'daily',
+            'workflowname': 'benchmark_report'
+        })
+        keys.append(f's3://benchmark/{key}')
+
+    start = time.perf_counter()
+    module.process_files(keys, 's3://benchmark/post-stage/amc/benchmark', 'benchmark-kms-key', 'benchmark_silver',
+                         scenario['mode'], chunk_rows=scenario['chunk_rows'], max_workers=scenario['workers'])
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on linux and in bytes on macos
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+
+    result_queue.put(dict(scenario,
+                          input_mb=round(len(data) * scenario['files'] / (1024 * 1024), 2),
+                          seconds=round(elapsed, 3),
+                          rows_per_sec=int(scenario['rows'] * scenario['files'] / elapsed),
+                          peak_rss_mb=round(peak_rss_mb, 1),
+                          **{phase: round(module.phase_timings.get(phase, 0.0), 3) for phase in PHASES}))
+
+
+def run_isolated(scenario):
+    # a fresh (spawned) process per scenario so the peak RSS is not carried over from the previous ones
+    context = multiprocessing.get_context('spawn')
+    result_queue = context.Queue()
+    process = context.Process(target=run_scenario, args=(scenario, result_queue))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f'scenario {scenario} failed with exit code {process.exitcode}')
+    return result_queue.get()
+
+
+def print_table(results):
+    header = ['mode', 'rows', 'columns', 'filtered_share', 'override_share', 'input_mb', 'rows_per_sec',
+              'peak_rss_mb'] + PHASES
+    widths = [max(len(h), *(len(str(r[h])) for r in results)) for h in header]
+    print('  '.join(h.rjust(w) for h, w in zip(header, widths)))
+    for result in results:
+        print('  '.join(str(result[h]).rjust(w) for h, w in zip(header, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--columns', type=int, nargs='+', default=[20, 60])
+    parser.add_argument('--filtered-share', type=float, nargs='+', default=[0.0, 0.5])
+    parser.add_argument('--override-share', type=float, nargs='+', default=[0.25])
+    parser.add_argument('--mode', choices=['batch', 'streaming'], nargs='+', default=['batch', 'streaming'])
+    parser.add_argument('--files', type=int, default=1, help='files per scenario')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--chunk-rows', type=int, default=100000)
+    parser.add_argument('--json', action='store_true', help='print the results as json lines')
+    args = parser.parse_args()
+
+    results = []
+    for mode, rows, columns, filtered_share, override_share in itertools.product(
+            args.mode, args.rows, args.columns, args.filtered_share, args.override_share):
+        results.append(run_isolated({
+            'mode': mode,
+            'rows': rows,
+            'columns': columns,
+            'filtered_share': filtered_share,
+            'override_share': override_share,
+            'files': args.files,
+            'workers': args.workers,
+            'chunk_rows': args.chunk_rows
+        }))
+        if args.json:
+            print(json.dumps(results[-1]))
+
+    if not args.json:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# Copyright 2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Import time (cold start) benchmark of the data lake Lambda handlers.
+
+Each handler, and each stage transform loaded by TransformHandler, is imported in a fresh
+interpreter with the data lake library layer on the path, the way the Lambda runtime imports
+it during a cold start. The import time is reported with the top level packages (pandas,
+awswrangler, boto3, ...) whose modules account for most of it (from python -X importtime). Handlers are only imported, no AWS call is made
+unless a module calls AWS at import time, which is reported as an error.
+
+Requires boto3 (the Lambda runtime dependencies):
+
+    python3 scripts/benchmarks/import_time_benchmark.py --repeat 5
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'amc_quickstart')
+LAYER_PATH = os.path.join(ROOT, 'foundations', 'layers', 'data_lake_library', 'python')
+HANDLER_PATTERNS = [
+    os.path.join(ROOT, 'data_lake', 'lambdas', '*', '*', 'handler.py'),
+    os.path.join(ROOT, 'foundations', 'lambdas', '*', 'handler.py'),
+]
+TRANSFORM_MODULES = [
+    'datalake_library.transforms.stage_a_transforms.amc_light_transform',
+    'datalake_library.transforms.stage_b_transforms.amc_heavy_transform',
+]
+
+# placeholders for the environment variables read at import time, AWS calls fail fast instead of reaching AWS
+BENCHMARK_ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'benchmark',
+    'AWS_SECRET_ACCESS_KEY': 'benchmark',
+    'AWS_EC2_METADATA_DISABLED': 'true',
+    'ENV': 'dev',
+    'ORG': 'benchmark',
+    'APP': 'benchmark',
+    'PREFIX': 'benchmark',
+    'stage_bucket': 'benchmark-stage',
+}
+
+IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start}))
+'''
+
+
+def import_once(module, handler_dir):
+    environment = dict(os.environ, **BENCHMARK_ENVIRONMENT)
+    environment['PYTHONPATH'] = os.pathsep.join(path for path in [handler_dir, LAYER_PATH] if path)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT, module],
+                             cwd=handler_dir or ROOT, env=environment, capture_output=True, text=True)
+    if process.returncode != 0:
+        return None, process.stderr.strip().splitlines()[-1]
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package", nested imports are indented
+    # two spaces per level and printed before the module importing them
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, package = line[len('import time:'):].split('|')
+        imports.append(((len(package) - len(package.lstrip()) - 1) // 2, package.strip(), int(self_us)))
+
+    # the imports of the module and of its parent packages, up to the previous top level import of the script
+    parents = {'.'.join(module.split('.')[:index]) for index in range(1, module.count('.') + 2)}
+    end = max(index for index, (level, package, _) in enumerate(imports) if level == 0 and package == module)
+    start = end
+    while start > 0 and not (imports[start - 1][0] == 0 and imports[start - 1][1] not in parents):
+        start -= 1
+
+    # the self time of every imported module is summed per top level package, so pandas counts the pandas.* modules
+    # and not numpy, and the packages add up to the import time of the module
+    top_level = {}
+    for _, package, self_us in imports[start:end + 1]:
+        top_level[package.split('.')[0]] = top_level.get(package.split('.')[0], 0) + self_us / 1e6
+    return json.loads(process.stdout.strip().splitlines()[-1])['seconds'], top_level
+
+
+def benchmark(name, module, handler_dir, repeat, top):
+    timings = []
+    top_level = {}
+    for _ in range(repeat):
+        seconds, details = import_once(module, handler_dir)
+        if seconds is None:
+            return {'name': name, 'error': details}
+        timings.append(seconds)
+        top_level = details
+    slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'name': name,
+        'median_seconds': round(statistics.median(timings), 4),
+        'max_seconds': round(max(timings), 4),
+        'slowest_imports': [[package, round(seconds, 4)] for package, seconds in slowest]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='cold imports per handler')
+    parser.add_argument('--top', type=int, default=5, help='top level packages with the most import time reported per handler')
+    parser.add_argument('--filter', default='', help='only benchmark the handlers whose name contains this')
+    parser.add_argument('--json', action='store_true', help='print the results as json lines')
+    args = parser.parse_args()
+
+    targets = []
+    for pattern in HANDLER_PATTERNS:
+        for handler in sorted(glob.glob(pattern)):
+            handler_dir = os.path.dirname(handler)
+            targets.append((os.path.relpath(handler_dir, ROOT), 'handler', handler_dir))
+    targets += [(module, module, None) for module in TRANSFORM_MODULES]
+
+    for name, module, handler_dir in targets:
+        if args.filter not in name:
+            continue
+        result = benchmark(name, module, handler_dir, args.repeat, args.top)
+        if args.json:
+            print(json.dumps(result))
+        elif 'error' in result:
+            print('{:<60} import failed: {}'.format(name, result['error']))
+        else:
+            print('{:<60} {:>8.3f}s  {}'.format(name, result['median_seconds'], ', '.join(
+                '{} {:.3f}s'.format(package, seconds) for package, seconds in result['slowest_imports'])))
+
+
+if __name__ == '__main__':
+    main()